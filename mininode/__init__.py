@@ -2,11 +2,21 @@
 import datetime
 import logging
 
-from mininode.client import MiniNode
-from mininode.crypto.account import create_private_key
+from mininode._retry import RetryBudget, RetryPolicy
+from mininode.client import AsyncMiniNode, MiniNode
+from mininode.crypto.account import Signer, create_private_key
 from mininode.utils import decode_seed_url, timestamp_to_datetime
 
-__all__ = ["MiniNode", "create_private_key", "decode_seed_url", "timestamp_to_datetime"]
+__all__ = [
+    "AsyncMiniNode",
+    "MiniNode",
+    "RetryBudget",
+    "RetryPolicy",
+    "Signer",
+    "create_private_key",
+    "decode_seed_url",
+    "timestamp_to_datetime",
+]
 __version__ = "0.3.4"
 __author__ = "liujuanjuan1984"
 
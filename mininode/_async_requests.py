@@ -0,0 +1,142 @@
+"""module AsyncHttpRequest"""
+import asyncio
+import logging
+import time
+from typing import Dict, Optional, Tuple, Union
+
+from mininode import utils
+from mininode._endpoints import Endpoint, EndpointPool
+from mininode._retry import RetryPolicy, split_timeout
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncHttpRequest:
+    """asyncio http requests, with a pooled aiohttp session"""
+
+    def __init__(
+        self,
+        api_base: Optional[str] = None,
+        jwt_token: Optional[str] = None,
+        keep_alive: bool = True,
+        user_agent: Optional[str] = None,
+        pool_size: int = 100,
+        endpoints: Optional[EndpointPool] = None,
+        timeout: Union[float, Tuple[float, float], None] = None,
+        retry: Optional[RetryPolicy] = None,
+    ):
+        """asyncio http request
+
+        Args:
+            api_base (str, optional): the api base of the fullnode.
+            jwt_token (str, optional): the jwt token to connect the fullnode.
+            keep_alive (bool, optional): keep the connections alive in the pool. Defaults to True.
+            user_agent (str, optional): the user agent of requests.
+            pool_size (int, optional): max connections in flight at the same time. Defaults to 100.
+            endpoints (EndpointPool, optional): the pool of fullnodes to route requests,
+                instead of api_base and jwt_token.
+            timeout (float or tuple, optional): seconds to wait for a fullnode before failover,
+                as (connect, read) or one number for both. Defaults to DEFAULT_TIMEOUT.
+            retry (RetryPolicy, optional): when and how long to wait to retry a failed request.
+        """
+        self.endpoints = endpoints or EndpointPool(
+            [Endpoint(api_base or "http://127.0.0.1", jwt_token)]
+        )
+        self.api_base = self.endpoints.endpoints[0].api_base
+        self.timeout = split_timeout(timeout)
+        self.retry = retry or RetryPolicy()
+        self.keep_alive = keep_alive
+        self.pool_size = pool_size
+        self._session = None
+
+        self.headers = {
+            "USER-AGENT": user_agent or "quorum.mininode.python",
+            "Content-Type": "application/json",
+        }
+        if not keep_alive:
+            self.headers.update({"Connection": "close"})
+
+    def _get_session(self):
+        """create the session lazily, inside the running event loop"""
+        if self._session is None or self._session.closed:
+            try:
+                import aiohttp  # pylint: disable=import-outside-toplevel
+            except ImportError as err:
+                raise ImportError(
+                    "AsyncHttpRequest requires aiohttp, install it by: pip install mininode[async]"
+                ) from err
+            connector = aiohttp.TCPConnector(limit=self.pool_size, force_close=not self.keep_alive)
+            connect, read = self.timeout
+            timeout = aiohttp.ClientTimeout(total=None, connect=connect, sock_read=read)
+            self._session = aiohttp.ClientSession(
+                connector=connector, headers=self.headers, timeout=timeout
+            )
+        return self._session
+
+    async def _request(
+        self,
+        method: str,
+        endpoint: str,
+        payload: Optional[Dict] = None,
+    ):
+        """common request, failover to the next fullnode when one errors or times out,
+        and retry with backoff when all of them fail, within the retry budget"""
+        payload = payload or {}
+        session = self._get_session()
+        candidates = self.endpoints.candidates()
+        self.retry.budget.deposit()
+        attempt = 0
+        while True:
+            _endpoint = candidates[attempt % len(candidates)]
+            url = utils.join_url(_endpoint.api_base, endpoint)
+            start = time.monotonic()
+            try:
+                status, resp_json = await self._send(session, _endpoint, method, url, payload)
+            except Exception as err:  # aiohttp.ClientError, asyncio.TimeoutError
+                _endpoint.record_failure()
+                if not self.retry.can_retry(attempt):
+                    raise
+                logger.warning("request %s error %s, retry", url, err)
+            else:
+                if status not in self.retry.retry_status:
+                    _endpoint.record_success(time.monotonic() - start)
+                    return resp_json
+                _endpoint.record_failure()
+                if not self.retry.can_retry(attempt):
+                    return resp_json
+                logger.warning("request %s status %s, retry", url, status)
+            await asyncio.sleep(self.retry.delay(attempt, len(candidates)))
+            attempt += 1
+
+    @staticmethod
+    async def _send(session, endpoint: Endpoint, method: str, url: str, payload: Dict):
+        """send the request to one endpoint, return the status and json"""
+        async with session.request(
+            method=method, url=url, json=payload, headers=endpoint.headers
+        ) as resp:
+            try:
+                resp_json = await resp.json(content_type=None)
+            except Exception as err:
+                logger.warning("response error %s", err)
+                resp_json = {}
+            return resp.status, resp_json
+
+    async def get(self, endpoint: str, payload: Optional[Dict] = None):
+        """get method request"""
+        return await self._request("get", endpoint, payload)
+
+    async def post(self, endpoint: str, payload: Optional[Dict] = None):
+        """post method request"""
+        return await self._request("post", endpoint, payload)
+
+    async def close(self):
+        """close the session and its connection pool"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
@@ -0,0 +1,107 @@
+"""module Endpoint and EndpointPool, to route requests among several fullnodes"""
+import logging
+import threading
+import time
+from typing import List, Optional
+from urllib import parse
+
+logger = logging.getLogger(__name__)
+
+
+class Endpoint:
+    """one fullnode api, with its health and the EWMA of its latency"""
+
+    def __init__(
+        self,
+        api_base: str,
+        jwt_token: Optional[str] = None,
+        alpha: float = 0.3,
+        cooldown: float = 5.0,
+        max_cooldown: float = 300.0,
+    ):
+        """
+        Args:
+            api_base (str): the api base of the fullnode, such as http://127.0.0.1:8000/api/v1
+            jwt_token (str, optional): the jwt token to connect the fullnode.
+            alpha (float, optional): weight of the newest latency in the EWMA. Defaults to 0.3.
+            cooldown (float, optional): seconds to skip the endpoint after the first failure,
+                doubled by every following failure. Defaults to 5.0.
+            max_cooldown (float, optional): upper limit of the cooldown. Defaults to 300.0.
+        """
+        self.api_base = api_base
+        self.jwt_token = jwt_token
+        self.alpha = alpha
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.latency = None
+        self.failures = 0
+        self.down_until = 0.0
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"Endpoint({self.api_base!r}, latency={self.latency}, failures={self.failures})"
+
+    @property
+    def headers(self):
+        """the headers which belong to this endpoint"""
+        if self.jwt_token:
+            return {"Authorization": f"Bearer {self.jwt_token}"}
+        return {}
+
+    @property
+    def healthy(self) -> bool:
+        """the endpoint is not in its cooldown after failures"""
+        return time.monotonic() >= self.down_until
+
+    def record_success(self, latency: float):
+        """update the EWMA latency and reset the failures"""
+        with self._lock:
+            if self.latency is None:
+                self.latency = latency
+            else:
+                self.latency = self.alpha * latency + (1 - self.alpha) * self.latency
+            self.failures = 0
+            self.down_until = 0.0
+
+    def record_failure(self):
+        """mark the endpoint as unhealthy for a cooldown, growing with failures"""
+        with self._lock:
+            self.failures += 1
+            cooldown = min(self.cooldown * 2 ** (self.failures - 1), self.max_cooldown)
+            self.down_until = time.monotonic() + cooldown
+        logger.warning("endpoint %s failed %s times", self.api_base, self.failures)
+
+
+class EndpointPool:
+    """a pool of fullnode endpoints, ordered by health and latency for each request"""
+
+    def __init__(self, endpoints: List[Endpoint]):
+        if not endpoints:
+            raise ValueError("at least one endpoint is required.")
+        self.endpoints = endpoints
+
+    def __len__(self):
+        return len(self.endpoints)
+
+    @classmethod
+    def from_urls(cls, urls: List[str], **kwargs) -> "EndpointPool":
+        """init the pool from fullnode urls as in seedurl, such as http://127.0.0.1:8000?jwt=xxx"""
+        endpoints = []
+        for url in urls:
+            _url = parse.urlparse(url)
+            if not (_url.scheme and _url.netloc):
+                raise ValueError(f"Invalid fullnode url: {url}")
+            jwt = parse.parse_qs(_url.query).get("jwt", [None])[0]
+            api_base = f"{_url.scheme}://{_url.netloc}/api/v1"
+            endpoints.append(Endpoint(api_base, jwt, **kwargs))
+        return cls(endpoints)
+
+    def candidates(self) -> List[Endpoint]:
+        """endpoints in the order to try: the fastest healthy one first,
+        endpoints without latency yet are tried before the measured ones,
+        and the unhealthy ones are kept at the end as the last resort."""
+        healthy = [i for i in self.endpoints if i.healthy]
+        unhealthy = [i for i in self.endpoints if not i.healthy]
+        healthy.sort(key=lambda i: -1.0 if i.latency is None else i.latency)
+        unhealthy.sort(key=lambda i: i.down_until)
+        return healthy + unhealthy
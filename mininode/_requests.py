@@ -1,11 +1,15 @@
-"""module HttpRequest """
+"""module HttpRequest"""
 import logging
 import os
-from typing import Dict, Optional
+import threading
+import time
+from typing import Dict, Optional, Tuple, Union
 
 import requests
 
 from mininode import utils
+from mininode._endpoints import Endpoint, EndpointPool
+from mininode._retry import RetryPolicy, split_timeout
 
 logger = logging.getLogger(__name__)
 
@@ -21,30 +25,76 @@ class HttpRequest:
         keep_alive: bool = False,
         no_proxy: bool = True,
         user_agent: Optional[str] = None,
+        endpoints: Optional[EndpointPool] = None,
+        timeout: Union[float, Tuple[float, float], None] = None,
+        pool_size: int = 20,
+        retry: Optional[RetryPolicy] = None,
     ):
-        """http request"""
-        requests.adapters.DEFAULT_RETRIES = 5
-        self.api_base = api_base or "http://127.0.0.1"
-        if is_session:
-            self._session = requests.Session()
-        else:
-            self._session = requests
+        """http request
 
-        self._session.keep_alive = self.keep_alive = keep_alive
+        endpoints: the pool of fullnodes to route requests, instead of api_base and jwt_token
+        timeout: seconds to wait for a fullnode before failover to the next one, as
+            (connect, read) or one number for both; defaults to DEFAULT_TIMEOUT
+        pool_size: connections kept to each fullnode, as many as the threads sending requests;
+            HttpRequest can be shared by threads, each thread has its own session on the pool
+        retry: when and how long to wait to retry a failed request, shared by clients to
+            share its retry budget
+        """
+        self.endpoints = endpoints or EndpointPool(
+            [Endpoint(api_base or "http://127.0.0.1", jwt_token)]
+        )
+        self.api_base = self.endpoints.endpoints[0].api_base
+        self.timeout = split_timeout(timeout)
+        self.retry = retry or RetryPolicy()
+        self.is_session = is_session
+        self.keep_alive = keep_alive
+        # 各线程使用自己的 Session，共享同一个连接池
+        self._adapter = requests.adapters.HTTPAdapter(
+            pool_connections=len(self.endpoints), pool_maxsize=pool_size, max_retries=0
+        )
+        self._local = threading.local()
 
         self.headers = {
             "USER-AGENT": user_agent or "quorum.mininode.python",
             "Content-Type": "application/json",
         }
-        if jwt_token:
-            self.headers.update({"Authorization": f"Bearer {jwt_token}"})
         if not keep_alive:
             self.headers.update({"Connection": "close"})
 
         if no_proxy:
-            _no_proxy = os.getenv("NO_PROXY", "")
-            if self.api_base not in _no_proxy:
-                os.environ["NO_PROXY"] = ",".join([_no_proxy, self.api_base])
+            for endpoint in self.endpoints.endpoints:
+                _no_proxy = os.getenv("NO_PROXY", "")
+                if endpoint.api_base not in _no_proxy:
+                    os.environ["NO_PROXY"] = ",".join([_no_proxy, endpoint.api_base])
+
+    @property
+    def _session(self):
+        """the requests.Session of the current thread, which shares the connection pool
+        with the sessions of other threads; or the requests module if not is_session"""
+        if not self.is_session:
+            return requests
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("http://", self._adapter)
+            session.mount("https://", self._adapter)
+            self._local.session = session
+        return session
+
+    def close(self):
+        """close the connections of the pool"""
+        self._adapter.close()
+
+    def _send(self, endpoint: Endpoint, method: str, url: str, payload: Dict):
+        """send the request to one endpoint"""
+        headers = {**self.headers, **endpoint.headers}
+        _params = dict(method=method, url=url, json=payload, headers=headers, timeout=self.timeout)
+        try:
+            resp = self._session.request(**_params)
+        except requests.exceptions.SSLError as err:  # SSLCertVerificationError
+            logger.warning("request error %s", err)
+            resp = self._session.request(**_params, verify=False)
+        return resp
 
     def _request(
         self,
@@ -52,16 +102,33 @@ class HttpRequest:
         endpoint: str,
         payload: Optional[Dict] = None,
     ):
-        """common request"""
+        """common request, failover to the next fullnode when one errors or times out,
+        and retry with backoff when all of them fail, within the retry budget"""
         payload = payload or {}
-        url = utils.join_url(self.api_base, endpoint)
-
-        try:
-            resp = self._session.request(method=method, url=url, json=payload, headers=self.headers)
-        except Exception as err:  # SSLCertVerificationError
-            logger.warning("request error %s", err)
-            _params = dict(method=method, url=url, json=payload, verify=False, headers=self.headers)
-            resp = self._session.request(**_params)
+        candidates = self.endpoints.candidates()
+        self.retry.budget.deposit()
+        attempt = 0
+        while True:
+            _endpoint = candidates[attempt % len(candidates)]
+            url = utils.join_url(_endpoint.api_base, endpoint)
+            start = time.monotonic()
+            try:
+                resp = self._send(_endpoint, method, url, payload)
+            except requests.exceptions.RequestException as err:
+                _endpoint.record_failure()
+                if not self.retry.can_retry(attempt):
+                    raise
+                logger.warning("request %s error %s, retry", url, err)
+            else:
+                if resp.status_code not in self.retry.retry_status:
+                    _endpoint.record_success(time.monotonic() - start)
+                    break
+                _endpoint.record_failure()
+                if not self.retry.can_retry(attempt):
+                    break
+                logger.warning("request %s status %s, retry", url, resp.status_code)
+            time.sleep(self.retry.delay(attempt, len(candidates)))
+            attempt += 1
 
         try:
             resp_json = resp.json()
@@ -0,0 +1,114 @@
+"""module RetryPolicy and RetryBudget, to retry failed requests without amplifying an outage"""
+import logging
+import random
+import threading
+import time
+from typing import Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# 连接超时与读取超时（秒），fullnode 无响应时不会一直阻塞调用方
+DEFAULT_TIMEOUT = (5.0, 30.0)
+
+# 限流与网关类错误说明该 fullnode 暂不可用，换一个 fullnode 或退避后重试
+RETRY_STATUS = (429, 502, 503, 504)
+
+
+def split_timeout(
+    timeout: Union[float, Tuple[Optional[float], Optional[float]], None] = None,
+) -> Tuple[Optional[float], Optional[float]]:
+    """(connect, read) timeout in seconds; a number is used for both, None is DEFAULT_TIMEOUT"""
+    if timeout is None:
+        return DEFAULT_TIMEOUT
+    if isinstance(timeout, (tuple, list)):
+        connect, read = timeout
+        return connect, read
+    return timeout, timeout
+
+
+class RetryBudget:
+    """a token bucket of retries shared by the requests of a client.
+
+    every request deposits ratio token, every retry withdraws one token, and min_per_sec
+    tokens are refilled each second; so while a fullnode is down, retries are at most
+    ratio of the requests instead of multiplying them.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_per_sec: float = 1.0, max_tokens: float = 10.0):
+        """
+        Args:
+            ratio (float, optional): retries allowed per request. Defaults to 0.2.
+            min_per_sec (float, optional): retries allowed per second at least. Defaults to 1.0.
+            max_tokens (float, optional): upper limit of the saved retries. Defaults to 10.0.
+        """
+        self.ratio = ratio
+        self.min_per_sec = min_per_sec
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.exhausted = 0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, tokens: float):
+        now = time.monotonic()
+        tokens += (now - self._updated) * self.min_per_sec
+        self._updated = now
+        self.tokens = min(self.tokens + tokens, self.max_tokens)
+
+    def deposit(self):
+        """a request is sent"""
+        with self._lock:
+            self._refill(self.ratio)
+
+    def withdraw(self) -> bool:
+        """take a token to retry, False if the budget is used up"""
+        with self._lock:
+            self._refill(0.0)
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            self.exhausted += 1
+        logger.warning("retry budget is used up, %s retries are skipped", self.exhausted)
+        return False
+
+
+class RetryPolicy:
+    """how many times and how long to wait before retrying a failed request.
+
+    the first retries failover to the other fullnodes at once; when every fullnode has
+    been tried, the retries wait for an exponential backoff with full jitter.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        backoff: float = 0.2,
+        max_backoff: float = 10.0,
+        retry_status: Tuple[int, ...] = RETRY_STATUS,
+        budget: Optional[RetryBudget] = None,
+    ):
+        """
+        Args:
+            max_retries (int, optional): retries after the first attempt. Defaults to 3.
+            backoff (float, optional): seconds of the first backoff, doubled by every retry.
+            max_backoff (float, optional): upper limit of the backoff. Defaults to 10.0.
+            retry_status (tuple, optional): the response status to retry.
+            budget (RetryBudget, optional): the budget of retries, which can be shared by clients
+                to limit the retries of the whole process; a new one if None.
+        """
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_status = retry_status
+        self.budget = budget or RetryBudget()
+
+    def can_retry(self, attempt: int) -> bool:
+        """the attempt-th (from 0) attempt failed, whether to try again"""
+        return attempt < self.max_retries and self.budget.withdraw()
+
+    def delay(self, attempt: int, num_endpoints: int) -> float:
+        """seconds to wait before the next attempt after the attempt-th one failed"""
+        retry = attempt + 1 - num_endpoints
+        if retry < 0:
+            return 0.0
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**retry))
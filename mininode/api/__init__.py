@@ -1,4 +1,35 @@
 """api"""
+from mininode.api.async_lightnode import AsyncQuorumLightNodeAPI
+from mininode.api.checkpoint import (
+    Checkpoint,
+    CheckpointStore,
+    JsonCheckpointStore,
+    SqliteCheckpointStore,
+)
+from mininode.api.dispatcher import Dispatcher, Handler
+from mininode.api.follow import AsyncFollower, Follower
 from mininode.api.lightnode import QuorumLightNodeAPI
+from mininode.api.outbox import Outbox
+from mininode.api.pager import AsyncContentPager, ContentPager, PagerStats
+from mininode.api.send_queue import SendQueue, TokenBucket
+from mininode.api.trx_store import TrxStore
 
-__all__ = ["QuorumLightNodeAPI"]
+__all__ = [
+    "AsyncQuorumLightNodeAPI",
+    "QuorumLightNodeAPI",
+    "AsyncContentPager",
+    "AsyncFollower",
+    "Checkpoint",
+    "CheckpointStore",
+    "Dispatcher",
+    "Follower",
+    "Handler",
+    "JsonCheckpointStore",
+    "Outbox",
+    "ContentPager",
+    "PagerStats",
+    "SendQueue",
+    "SqliteCheckpointStore",
+    "TokenBucket",
+    "TrxStore",
+]
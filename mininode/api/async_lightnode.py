@@ -0,0 +1,315 @@
+"""async_lightnode.py"""
+import asyncio
+import copy
+import functools
+import logging
+from concurrent.futures import Executor
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
+
+from mininode import utils
+from mininode.api.base import AsyncBaseAPI
+from mininode.api.checkpoint import Checkpoint
+from mininode.api.follow import AsyncFollower
+from mininode.api.lightnode import QuorumLightNodeAPI, _is_trx
+from mininode.api.pager import AsyncContentPager
+from mininode.crypto.account import Signer, get_signer
+from mininode.crypto.sign_trx import trx_decrypt
+from mininode.utils import file as file_utils
+from mininode.utils.image import CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncQuorumLightNodeAPI(AsyncBaseAPI, QuorumLightNodeAPI):
+    """the asyncio light node api for quorum, with the same methods as QuorumLightNodeAPI.
+
+    every method which requests the fullnode is awaitable, such as send_content, like,
+    get_trx, get_group_info; get_all_contents is an async generator.
+    """
+
+    async def edit_trx(
+        self,
+        private_key: Union[str, int, bytes, Signer],
+        trx_id: str,
+        check_sender: bool = False,
+        content: Optional[str] = None,
+        name: Optional[str] = None,
+        images: Optional[List] = None,
+        timestamp: Union[str, int, float, None] = None,
+    ):
+        """edit trx content, which is to send a new trx but connected to the old trx."""
+        if check_sender:
+            self._check_sender(private_key, await self.get_trx(trx_id))
+        obj = self._edit_obj(trx_id, content=content, name=name, images=images)
+        return await self.send_trx(private_key, obj=obj, timestamp=timestamp)
+
+    async def send_trx(
+        self,
+        private_key: Union[str, int, bytes, Signer],
+        obj: Optional[Dict] = None,
+        person: Optional[Dict] = None,
+        timestamp: Union[str, int, float, None] = None,
+    ):
+        """
+        obj/person: dict
+        timestamp:2022-10-05 12:34
+        """
+        trx = self._pack_trx(private_key, obj=obj, person=person, timestamp=timestamp)
+        return await self._post(endpoint=f"/node/trx/{self.group_id}", payload=trx)
+
+    async def send_many(
+        self,
+        items: List[Dict],
+        private_key: Union[str, int, bytes, Signer, None] = None,
+        max_workers: Optional[int] = None,
+        executor: Optional[Executor] = None,
+    ) -> List:
+        """sign many trxs across a process pool as encrypt_many, then send them concurrently.
+
+        returns the responses in the order of items; if an item fails,
+        its exception is returned in its place and the others go on.
+        """
+        _encrypt = functools.partial(self.encrypt_many, items, private_key, max_workers, executor)
+        trxs = await asyncio.get_running_loop().run_in_executor(None, _encrypt)
+
+        async def _send(trx):
+            if isinstance(trx, Exception):
+                return trx
+            return await self._post(endpoint=f"/node/trx/{self.group_id}", payload=trx)
+
+        return await asyncio.gather(*[_send(trx) for trx in trxs], return_exceptions=True)
+
+    async def upload_file(
+        self,
+        private_key: Union[str, int, bytes, Signer],
+        file: Union[str, BinaryIO],
+        name: Optional[str] = None,
+        chunk_size: int = CHUNK_SIZE,
+        max_workers: int = 4,
+        timestamp: Union[str, int, float, None] = None,
+    ) -> Dict:
+        """upload a file as trxs of chunks, max_workers of them in flight at the same time;
+        see QuorumLightNodeAPI.upload_file"""
+        signer = get_signer(private_key)
+        fileinfo = {"name": file_utils.file_name(file, name)}
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def _send(index: int, chunk: bytes):
+            try:
+                return await self._send_segment(signer, index, chunk, timestamp)
+            finally:
+                semaphore.release()
+
+        tasks = []
+        try:
+            for index, chunk in file_utils.iter_segments(file, fileinfo, chunk_size):
+                await semaphore.acquire()
+                tasks.append(asyncio.ensure_future(_send(index, chunk)))
+            fileinfo["segments"] = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        resp = await self.send_trx(
+            signer, obj=file_utils.fileinfo_obj(fileinfo), timestamp=timestamp
+        )
+        fileinfo["trx_id"] = self._sent_trx_id(resp, file_utils.FILEINFO_NAME)
+        return fileinfo
+
+    async def _send_segment(self, signer: Signer, index: int, chunk: bytes, timestamp=None) -> Dict:
+        """send the index-th chunk, return its item of fileinfo"""
+        obj = file_utils.segment_obj(index, chunk)
+        resp = await self.send_trx(signer, obj=obj, timestamp=timestamp)
+        return file_utils.segment_info(
+            index, chunk, self._sent_trx_id(resp, f"{file_utils.SEGMENT_PREFIX}{index}")
+        )
+
+    async def download_file(
+        self,
+        fileinfo: Union[str, Dict],
+        file_dir: str = ".",
+        file_path: Optional[str] = None,
+        max_workers: int = 4,
+    ) -> str:
+        """download the file uploaded by upload_file, max_workers segments in flight
+        at the same time; see QuorumLightNodeAPI.download_file"""
+        if isinstance(fileinfo, str):
+            fileinfo = file_utils.parse_fileinfo(await self.trx(fileinfo))
+        path = file_utils.download_path(fileinfo, file_dir, file_path)
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def _write(write_f, offset: int, segment: Dict):
+            async with semaphore:
+                # 分段的 trx 体积大且只读一次，不经过 cache
+                trx = trx_decrypt(self.aes_key, await self._fetch_trx(segment["trx_id"]))
+            data = file_utils.segment_bytes(trx, segment)
+            write_f.seek(offset)
+            write_f.write(data)
+
+        with file_utils.open_download(path, fileinfo) as write_f:
+            tasks = [
+                asyncio.ensure_future(_write(write_f, offset, segment))
+                for offset, segment in file_utils.segment_offsets(fileinfo)
+            ]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
+        return path
+
+    async def get_trx(self, trx_id: str):
+        """get encrpyted trx, from the cache and the local store first if they are set;
+        a copy of the cached trx is returned, so the caller may modify it"""
+        if self.cache is None:
+            return await self._fetch_trx(trx_id)
+        encrypted_trx = await self.cache.aget_or_load(
+            (self.group_id, "get_trx", trx_id), lambda: self._fetch_trx(trx_id), _is_trx
+        )
+        return copy.deepcopy(encrypted_trx)
+
+    async def _fetch_trx(self, trx_id: str):
+        """get encrpyted trx from the local store, or from the fullnode"""
+        if self.store:
+            # SQLite 的读取是阻塞的，放到线程池中执行
+            loop = asyncio.get_running_loop()
+            encrypted_trx = await loop.run_in_executor(None, self.store.get, self.group_id, trx_id)
+            if encrypted_trx:
+                return encrypted_trx
+        encrypted_trx = await self._get(endpoint=f"/trx/{self.group_id}/{trx_id}")
+        await self._asave_trxs([encrypted_trx])
+        return encrypted_trx
+
+    async def _asave_trxs(self, encrypted_trxs):
+        """save the trxs to the local store in the default executor, off the event loop"""
+        if self.store and isinstance(encrypted_trxs, list):
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._save_trxs, encrypted_trxs)
+
+    async def get_local_contents(self, *args, **kwargs) -> List:
+        """asyncio version of get_local_contents, which queries the local store and decrypts
+        the trxs in the default executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, functools.partial(QuorumLightNodeAPI.get_local_contents, self, *args, **kwargs)
+        )
+
+    async def trx(self, trx_id: str):
+        """get decrypted trx, through the cache if it is set; a copy of the cached trx is
+        returned, so the caller may modify it"""
+        if self.cache is None:
+            return trx_decrypt(self.aes_key, await self.get_trx(trx_id))
+
+        async def _load():
+            return trx_decrypt(self.aes_key, await self.get_trx(trx_id))
+
+        trx = await self.cache.aget_or_load((self.group_id, "trx", trx_id), _load)
+        return copy.deepcopy(trx)
+
+    async def get_content(
+        self,
+        start_trx: Optional[str] = None,
+        num: int = 20,
+        reverse: bool = False,
+        include_start_trx: bool = False,
+        senders: Optional[List] = None,
+        trx_types: Optional[Tuple] = None,
+        lazy: bool = False,
+    ):
+        """get content
+
+        lazy: return LazyTrx which is decrypted only when its TypeUrl or Content is accessed
+        """
+        payload = self._content_payload(start_trx, num, reverse, include_start_trx)
+        encypted_trxs = await self._post(f"/node/groupctn/{self.group_id}", payload=payload)
+        await self._asave_trxs(encypted_trxs)
+        # 解密是 CPU 密集的，放到线程池中执行，不阻塞事件循环
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, self._decrypt_contents, encypted_trxs, senders, trx_types, lazy
+        )
+
+    def content_pager(self, start_trx: Optional[str] = None, **kwargs) -> AsyncContentPager:
+        """the async pager of all contents after start_trx, with stats of pages, bytes and trx/s.
+        kwargs: senders, trx_types, lazy, min_num, max_num, target_latency, max_page_bytes,
+        stall_limit, checkpoint, error_limit, retry_interval of ContentPager"""
+        return AsyncContentPager(self, start_trx=start_trx, **kwargs)
+
+    async def _get_encrypted_content(
+        self, start_trx: Optional[str] = None, num: int = 20, reverse: bool = False
+    ):
+        """get the encrypted trxs of get_content"""
+        payload = self._content_payload(start_trx, num, reverse)
+        encrypted_trxs = await self._post(f"/node/groupctn/{self.group_id}", payload=payload)
+        await self._asave_trxs(encrypted_trxs)
+        return encrypted_trxs
+
+    def follow(self, start_trx: Optional[str] = None, **kwargs) -> AsyncFollower:
+        """follow the new trxs of the group as they arrive, from start_trx or the newest trx.
+        kwargs: senders, trx_types, lazy, num, min_interval, max_interval, backoff, max_idle,
+        max_seen, checkpoint of Follower"""
+        return AsyncFollower(self, start_trx=start_trx, **kwargs)
+
+    async def get_all_contents(
+        self,
+        start_trx: Optional[str] = None,
+        senders: Optional[List] = None,
+        trx_types: Optional[Tuple] = None,
+        lazy: bool = False,
+        checkpoint: Optional[Checkpoint] = None,
+    ):
+        """get all contents as an async generator
+
+        lazy: yield LazyTrx which is decrypted only when its TypeUrl or Content is accessed
+        checkpoint: resume from its cursor if start_trx is None, and commit the handled trxs
+        """
+        pager = self.content_pager(
+            start_trx, senders=senders, trx_types=trx_types, lazy=lazy, checkpoint=checkpoint
+        ).__aiter__()
+        try:
+            async for trx in pager:
+                yield trx
+        finally:
+            # 关闭时立即关闭 pager，使 checkpoint 在此时提交
+            await pager.aclose()
+
+    async def get_profiles(
+        self,
+        types=("name", "image"),
+        senders: Optional[List] = None,
+        users: Optional[Dict] = None,
+        checkpoint: Optional[Checkpoint] = None,
+    ):
+        """get profiles of users
+
+        checkpoint: resume from its cursor instead of users["progress_tid"] if it is not given
+        """
+        users = users or {}
+        progress_tid = users.get("progress_tid", None)
+        trxs = self.get_all_contents(
+            start_trx=progress_tid,
+            trx_types=("person",),
+            senders=senders,
+            checkpoint=checkpoint,
+        )
+
+        async for trx in trxs:
+            progress_tid = trx["TrxId"]
+            self._update_profile(users, trx, types)
+
+        users["progress_tid"] = progress_tid
+        return users
+
+    async def trx_retweet_params(
+        self, trx: Dict, nicknames: Optional[Dict] = None, **kwargs
+    ) -> Dict:
+        """trans from trx to an object of new trx to send to chain."""
+        refer_tid = self._refer_trx_id(trx)
+        refer_trx = None
+        if refer_tid:
+            refer_trx = await self.trx(trx_id=refer_tid)
+        params = utils.init_trx_retweet_params(
+            trx=trx, refer_trx=refer_trx, nicknames=nicknames, **kwargs
+        )
+        return params
@@ -2,7 +2,9 @@
 import logging
 from typing import Dict, Optional
 
+from mininode._async_requests import AsyncHttpRequest
 from mininode._requests import HttpRequest
+from mininode.api.checkpoint import Checkpoint, CheckpointStore
 
 logger = logging.getLogger(__name__)
 
@@ -23,3 +25,29 @@ class BaseAPI:
     def _post(self, endpoint: str, payload: Optional[Dict] = None):
         """api _post"""
         return self._http.post(endpoint, payload)
+
+    def checkpoint(
+        self,
+        store: CheckpointStore,
+        consumer: str = "default",
+        every: int = 100,
+        interval: float = 5.0,
+    ) -> Checkpoint:
+        """the checkpoint of the consumer of this group, to pass to get_all_contents,
+        content_pager or follow; committed every `every` trxs or `interval` seconds"""
+        return Checkpoint(store, self.group_id, consumer, every=every, interval=interval)
+
+
+class AsyncBaseAPI(BaseAPI):
+    """AsyncBaseAPI"""
+
+    def __init__(self, http: AsyncHttpRequest, group_id, aes_key, version: int = 1, **kwargs):
+        super().__init__(http, group_id, aes_key, version=version, **kwargs)
+
+    async def _get(self, endpoint: str, payload: Optional[Dict] = None):
+        """api _get"""
+        return await self._http.get(endpoint, payload)
+
+    async def _post(self, endpoint: str, payload: Optional[Dict] = None):
+        """api _post"""
+        return await self._http.post(endpoint, payload)
@@ -0,0 +1,182 @@
+"""checkpoint.py: save the cursor of each consumer of a group, to resume syncing after a restart"""
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointStore:
+    """the last handled TrxId of each named consumer of a group, in memory"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, str]] = {}
+
+    def get(self, group_id: str, consumer: str = "default") -> Optional[str]:
+        """the saved cursor of the consumer, None if it has not synced yet"""
+        with self._lock:
+            return self._data.get(group_id, {}).get(consumer)
+
+    def set(self, group_id: str, consumer: str, trx_id: str):
+        """save the cursor of the consumer"""
+        with self._lock:
+            self._data.setdefault(group_id, {})[consumer] = trx_id
+
+    def delete(self, group_id: str, consumer: str = "default"):
+        """forget the cursor, the consumer syncs from the beginning again"""
+        with self._lock:
+            self._data.get(group_id, {}).pop(consumer, None)
+
+    def consumers(self, group_id: str) -> Dict[str, str]:
+        """the cursors of all the consumers of the group"""
+        with self._lock:
+            return dict(self._data.get(group_id, {}))
+
+    def close(self):
+        """release the resources of the store"""
+
+
+class JsonCheckpointStore(CheckpointStore):
+    """cursors in a json file, which is replaced atomically on every save"""
+
+    def __init__(self, path: str = "mininode_checkpoints.json"):
+        super().__init__()
+        self.path = path
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as read_f:
+                self._data = json.load(read_f)
+
+    def set(self, group_id: str, consumer: str, trx_id: str):
+        with self._lock:
+            self._data.setdefault(group_id, {})[consumer] = trx_id
+            self._dump()
+
+    def delete(self, group_id: str, consumer: str = "default"):
+        with self._lock:
+            if self._data.get(group_id, {}).pop(consumer, None) is not None:
+                self._dump()
+
+    def _dump(self):
+        # 先写临时文件并 fsync 再替换，进程崩溃时不会留下写了一半的文件
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as write_f:
+                json.dump(self._data, write_f, indent=1)
+                write_f.flush()
+                os.fsync(write_f.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+
+class SqliteCheckpointStore(CheckpointStore):
+    """cursors in a SQLite table, every save is a transaction"""
+
+    def __init__(self, path: str = "mininode_checkpoints.db"):
+        super().__init__()
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoint (group_id TEXT NOT NULL, consumer TEXT NOT NULL,"
+            " trx_id TEXT NOT NULL, updated REAL NOT NULL, PRIMARY KEY (group_id, consumer))"
+        )
+
+    def get(self, group_id: str, consumer: str = "default") -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT trx_id FROM checkpoint WHERE group_id = ? AND consumer = ?",
+                (group_id, consumer),
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, group_id: str, consumer: str, trx_id: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoint (group_id, consumer, trx_id, updated)"
+                " VALUES (?, ?, ?, ?)",
+                (group_id, consumer, trx_id, time.time()),
+            )
+
+    def delete(self, group_id: str, consumer: str = "default"):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM checkpoint WHERE group_id = ? AND consumer = ?", (group_id, consumer)
+            )
+
+    def consumers(self, group_id: str) -> Dict[str, str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT consumer, trx_id FROM checkpoint WHERE group_id = ?", (group_id,)
+            ).fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class Checkpoint:
+    """the cursor of a consumer of a group, committed to the store every `every` trxs
+    or `interval` seconds, and when the pager stops.
+
+    only the trxs which the consumer has handled are committed: a trx is handled when
+    the consumer asks the pager for the next one, so after a crash syncing resumes
+    from the last handled trx, and a trx may be handled again but is never skipped.
+    """
+
+    def __init__(
+        self,
+        store: CheckpointStore,
+        group_id: str,
+        consumer: str = "default",
+        every: int = 100,
+        interval: float = 5.0,
+    ):
+        """
+        Args:
+            store (CheckpointStore): where the cursor is saved.
+            group_id (str): the group synced.
+            consumer (str, optional): the name of the pipeline, each one has its own cursor.
+            every (int, optional): commit after so many trxs are handled.
+            interval (float, optional): commit after so many seconds.
+        """
+        self.store = store
+        self.group_id = group_id
+        self.consumer = consumer
+        self.every = every
+        self.interval = interval
+        self.trx_id: Optional[str] = None
+        self._committed: Optional[str] = None
+        self._count = 0
+        self._last_commit = time.monotonic()
+
+    def load(self) -> Optional[str]:
+        """the saved cursor"""
+        self.trx_id = self._committed = self.store.get(self.group_id, self.consumer)
+        return self.trx_id
+
+    def advance(self, trx_id: Optional[str], count: int = 1):
+        """count trxs up to trx_id are handled, commit if it is due"""
+        if not trx_id:
+            return
+        self.trx_id = trx_id
+        self._count += count
+        if self._count >= self.every or time.monotonic() - self._last_commit >= self.interval:
+            self.commit()
+
+    def commit(self):
+        """save the cursor now, if it moved"""
+        self._count = 0
+        self._last_commit = time.monotonic()
+        if self.trx_id and self.trx_id != self._committed:
+            self.store.set(self.group_id, self.consumer, self.trx_id)
+            self._committed = self.trx_id
@@ -0,0 +1,225 @@
+"""dispatcher.py: route trxs by type and sender to handlers run by a pool of workers"""
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+
+from mininode.utils.trx_retweet import get_trx_type
+
+logger = logging.getLogger(__name__)
+
+
+class Handler:
+    """a handler of the trxs of trx_types from senders, at most concurrency calls at once"""
+
+    def __init__(
+        self,
+        func: Callable,
+        trx_types: Optional[Iterable[str]] = None,
+        senders: Optional[Iterable[str]] = None,
+        concurrency: Optional[int] = None,
+    ):
+        self.func = func
+        self.name = getattr(func, "__name__", repr(func))
+        self.trx_types = set(trx_types) if trx_types else None
+        self.senders = set(senders) if senders else None
+        self._slots = threading.BoundedSemaphore(concurrency) if concurrency else None
+        self.stats = {"calls": 0, "errors": 0}
+
+    def match(self, trx_types: Iterable[str], sender: Optional[str]) -> bool:
+        """whether the trx of trx_types from sender is handled"""
+        if self.senders is not None and sender not in self.senders:
+            return False
+        return self.trx_types is None or not self.trx_types.isdisjoint(trx_types)
+
+    def __call__(self, trx):
+        if self._slots is None:
+            return self.func(trx)
+        with self._slots:
+            return self.func(trx)
+
+
+class Dispatcher:
+    """call the registered handlers of every trx on a bounded pool of workers.
+
+    the trxs of a sender are handled one by one in the order they are dispatched, while
+    the trxs of different senders are handled in parallel; dispatch blocks when capacity
+    trxs are pending, so a slow handler slows down the fetcher instead of filling memory.
+
+        dispatcher = Dispatcher(workers=8)
+
+        @dispatcher.on("reply", "text_only")
+        def answer(trx):
+            ...
+
+        dispatcher.run(bot.api.follow())
+    """
+
+    def __init__(
+        self,
+        workers: int = 8,
+        capacity: int = 1000,
+        batch: int = 16,
+        on_error: Optional[Callable] = None,
+    ):
+        """
+        Args:
+            workers (int, optional): threads which call the handlers.
+            capacity (int, optional): trxs dispatched but not handled yet at most.
+            batch (int, optional): trxs of a sender handled before the worker turns to
+                the other senders.
+            on_error (callable, optional): called as on_error(handler, trx, err)
+                when a handler raises; the error is logged if None.
+        """
+        self.batch = batch
+        self.on_error = on_error
+        self._handlers: List[Handler] = []
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="mininode-dispatch"
+        )
+        self._capacity = threading.BoundedSemaphore(capacity)
+        self._lock = threading.Lock()
+        self._lanes: Dict[Optional[str], deque] = {}
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0
+        self._stats = {"dispatched": 0, "handled": 0, "unhandled": 0, "errors": 0}
+
+    def add_handler(
+        self,
+        func: Callable,
+        trx_types: Optional[Iterable[str]] = None,
+        senders: Optional[Iterable[str]] = None,
+        concurrency: Optional[int] = None,
+    ) -> Handler:
+        """register func(trx) for the trxs of trx_types from senders, all if None;
+        trx_types are the types of utils.get_trx_type, such as "reply" or "reply_text_only".
+        concurrency: calls of func running at once at most, no limit if None."""
+        handler = Handler(func, trx_types, senders, concurrency)
+        with self._lock:
+            self._handlers.append(handler)
+        return handler
+
+    def on(self, *trx_types: str, senders: Optional[Iterable[str]] = None, concurrency=None):
+        """decorator of add_handler"""
+
+        def _register(func: Callable) -> Callable:
+            self.add_handler(func, trx_types or None, senders, concurrency)
+            return func
+
+        return _register
+
+    @staticmethod
+    def _trx_types(trx) -> set:
+        """the type of the trx, and the type of its reply in detail"""
+        if hasattr(trx, "trx_type"):  # LazyTrx 在 protobuf 上判断类型
+            return {trx.trx_type(), trx.trx_type(deep_to_reply=True)}
+        return {get_trx_type(trx), get_trx_type(trx, deep_to_reply=True)}
+
+    def dispatch(self, trx, timeout: Optional[float] = None) -> bool:
+        """queue the trx to its handlers, wait while capacity trxs are pending;
+        return False if the trx is not queued in timeout seconds"""
+        if not self._capacity.acquire(timeout=timeout):
+            return False
+        sender = trx.get("Publisher")
+        with self._lock:
+            self._stats["dispatched"] += 1
+            self._pending += 1
+            lane = self._lanes.get(sender)
+            if lane is not None:
+                # 该 sender 已有 worker 在处理，排在其后以保证顺序
+                lane.append(trx)
+                return True
+            self._lanes[sender] = deque([trx])
+        self._executor.submit(self._run_lane, sender)
+        return True
+
+    def _run_lane(self, sender: Optional[str]):
+        """handle the queued trxs of sender in order, a batch at a time"""
+        for _ in range(self.batch):
+            with self._lock:
+                lane = self._lanes[sender]
+                if not lane:
+                    del self._lanes[sender]
+                    return
+                trx = lane[0]
+            try:
+                self._handle(trx)
+            except Exception as err:  # pylint: disable=broad-except
+                # 分派本身出错也不能卡住该 sender 的队列
+                logger.warning("dispatch of trx %s error: %s", trx.get("TrxId"), err)
+            finally:
+                with self._lock:
+                    lane.popleft()
+                    self._pending -= 1
+                    if not self._pending:
+                        self._idle.notify_all()
+                self._capacity.release()
+        # 让出 worker 给其它 sender，剩余的 trx 重新排队
+        self._executor.submit(self._run_lane, sender)
+
+    def _handle(self, trx):
+        trx_types = self._trx_types(trx)
+        sender = trx.get("Publisher")
+        handlers = [i for i in self._handlers if i.match(trx_types, sender)]
+        if not handlers:
+            with self._lock:
+                self._stats["unhandled"] += 1
+            return
+        for handler in handlers:
+            try:
+                handler(trx)
+                failed = False
+            except Exception as err:
+                failed = True
+                self._report(handler, trx, err)
+            with self._lock:
+                handler.stats["calls"] += 1
+                if failed:
+                    handler.stats["errors"] += 1
+                    self._stats["errors"] += 1
+        with self._lock:
+            self._stats["handled"] += 1
+
+    def _report(self, handler: Handler, trx, err: Exception):
+        """pass the error of handler to on_error, or log it"""
+        if self.on_error:
+            try:
+                self.on_error(handler, trx, err)
+                return
+            except Exception as on_error_err:  # pylint: disable=broad-except
+                logger.warning("on_error of trx %s error: %s", trx.get("TrxId"), on_error_err)
+        logger.warning("handler %s of trx %s error: %s", handler.name, trx.get("TrxId"), err)
+
+    def run(self, trxs: Iterable, wait: bool = True):
+        """dispatch the trxs of an iterable, such as api.follow() or api.get_all_contents();
+        the iteration is paused while capacity trxs are pending"""
+        for trx in trxs:
+            self.dispatch(trx)
+        if wait:
+            self.join()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """wait until every dispatched trx is handled, False on timeout"""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._pending, timeout)
+
+    def stats(self) -> Dict:
+        """dispatched, handled, unhandled, errors, pending, senders with pending trxs,
+        and the calls and errors of each handler"""
+        with self._lock:
+            stats = dict(self._stats, pending=self._pending, senders=len(self._lanes))
+            stats["handlers"] = {i.name: dict(i.stats) for i in self._handlers}
+        return stats
+
+    def close(self, wait: bool = True):
+        """stop the workers, after the pending trxs are handled if wait"""
+        if wait:
+            self.join()
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
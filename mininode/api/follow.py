@@ -0,0 +1,242 @@
+"""follow.py: tail the trxs of a group, polling with an adaptive interval"""
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from mininode.api.checkpoint import Checkpoint
+
+logger = logging.getLogger(__name__)
+
+
+class _BaseFollower:
+    """the cursor, the poll interval and the recently seen trxs of a follower"""
+
+    def __init__(
+        self,
+        api,
+        start_trx: Optional[str] = None,
+        senders: Optional[List] = None,
+        trx_types: Optional[Tuple] = None,
+        lazy: bool = False,
+        num: int = 50,
+        min_interval: float = 0.5,
+        max_interval: float = 30.0,
+        backoff: float = 2.0,
+        max_idle: Optional[float] = None,
+        max_seen: int = 10000,
+        checkpoint: Optional[Checkpoint] = None,
+    ):
+        """
+        Args:
+            api: the QuorumLightNodeAPI or AsyncQuorumLightNodeAPI to fetch and decrypt trxs.
+            start_trx (str, optional): the cursor, trxs after it are yielded;
+                if None, follow from the newest trx of the group.
+            senders (list, optional): only the trxs of senders are decrypted and yielded.
+            trx_types (tuple, optional): only the trxs of trx_types are yielded.
+            lazy (bool, optional): yield LazyTrx, decrypted only when its Content is accessed.
+            num (int, optional): trxs fetched per poll; a full page is followed at once.
+            min_interval (float, optional): seconds between polls while trxs are arriving.
+            max_interval (float, optional): upper limit of the seconds between idle polls.
+            backoff (float, optional): the interval is multiplied by it after an idle poll.
+            max_idle (float, optional): stop after so many seconds without new trxs,
+                follow forever if None.
+            max_seen (int, optional): TrxIds remembered to skip the trxs already yielded.
+            checkpoint (Checkpoint, optional): resume from its cursor if start_trx is None,
+                and commit the handled trxs to it.
+        """
+        if checkpoint and start_trx is None:
+            start_trx = checkpoint.load()
+        self.api = api
+        self.start_trx = start_trx
+        self.senders = set(senders) if senders else None
+        self.trx_types = trx_types
+        self.lazy = lazy
+        self.num = num
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.max_idle = max_idle
+        self.max_seen = max_seen
+        self.checkpoint = checkpoint
+        self.interval = min_interval
+        self.stats = {"polls": 0, "idle_polls": 0, "errors": 0, "trxs": 0, "duplicates": 0}
+        self._seen = OrderedDict()
+        self._last_new = time.monotonic()
+
+    def _new_trxs(self, encrypted_trxs) -> List:
+        """the trxs of the page not seen before, and move the cursor to the end of the page"""
+        self.stats["polls"] += 1
+        if not isinstance(encrypted_trxs, list):
+            logger.warning("get_content error: %s", encrypted_trxs)
+            self.stats["errors"] += 1
+            return []
+        new_trxs = []
+        for trx in encrypted_trxs:
+            trx_id = trx.get("TrxId")
+            if trx_id in self._seen:
+                self.stats["duplicates"] += 1
+                continue
+            # 只记住最近的 max_seen 个 TrxId，内存有界
+            self._seen[trx_id] = None
+            if len(self._seen) > self.max_seen:
+                self._seen.popitem(last=False)
+            new_trxs.append(trx)
+        if encrypted_trxs:
+            self.start_trx = encrypted_trxs[-1]["TrxId"]
+        self.stats["trxs"] += len(new_trxs)
+        return new_trxs
+
+    def _handled(self, trx_id: Optional[str], count: int = 1):
+        """the consumer has handled count trxs up to trx_id"""
+        if self.checkpoint:
+            self.checkpoint.advance(trx_id, count)
+
+    def _commit(self):
+        if self.checkpoint:
+            self.checkpoint.commit()
+
+    def _next_wait(self, count: int) -> Optional[float]:
+        """seconds to wait before the next poll after count new trxs, or None to stop"""
+        now = time.monotonic()
+        if count >= self.num:
+            # 整页说明还有积压，立即拉取下一页
+            self.interval = self.min_interval
+            self._last_new = now
+            return 0.0
+        if count > 0:
+            self.interval = self.min_interval
+            self._last_new = now
+            return self.interval
+        self.stats["idle_polls"] += 1
+        if self.max_idle is not None and now - self._last_new >= self.max_idle:
+            return None
+        wait = self.interval
+        self.interval = min(self.interval * self.backoff, self.max_interval)
+        return wait
+
+    def _on_error(self, err: Exception) -> float:
+        """back off after a failed poll"""
+        logger.warning("follow error: %s", err)
+        self.stats["errors"] += 1
+        wait = self.interval
+        self.interval = min(self.interval * self.backoff, self.max_interval)
+        return wait
+
+    def as_dict(self) -> Dict:
+        """stats of the follower, with the cursor and the current interval"""
+        return dict(self.stats, start_trx=self.start_trx, interval=self.interval)
+
+
+class Follower(_BaseFollower):
+    """iterate the decrypted trxs of a group as they arrive, until stop() or max_idle.
+
+    polls at min_interval while trxs are arriving, and backs off exponentially up to
+    max_interval while the group is idle; a bounded set of TrxIds skips duplicates.
+    """
+
+    def __init__(self, api, *args, **kwargs):
+        super().__init__(api, *args, **kwargs)
+        self._stop = threading.Event()
+
+    def stop(self):
+        """stop following, also wakes up the waiting poll"""
+        self._stop.set()
+
+    def _latest(self) -> Optional[str]:
+        trxs = self.api._get_encrypted_content(None, 1, reverse=True)
+        return trxs[0]["TrxId"] if isinstance(trxs, list) and trxs else None
+
+    def __iter__(self):
+        if self.start_trx is None:
+            self.start_trx = self._latest()
+        try:
+            while not self._stop.is_set():
+                try:
+                    encrypted_trxs = self.api._get_encrypted_content(self.start_trx, self.num)
+                except Exception as err:  # requests.RequestException, ValueError
+                    self._stop.wait(self._on_error(err))
+                    continue
+                new_trxs = self._new_trxs(encrypted_trxs)
+                trxs = []
+                if new_trxs:
+                    trxs = self.api._decrypt_contents(
+                        new_trxs, self.senders, self.trx_types, self.lazy
+                    )
+                for trx in trxs:
+                    yield trx
+                    self._handled(trx["TrxId"])
+                # 被 senders/trx_types 筛掉的 trx 也算已处理
+                self._handled(self.start_trx, len(new_trxs) - len(trxs))
+                wait = self._next_wait(len(new_trxs))
+                if wait is None:
+                    return
+                if wait:
+                    self._stop.wait(wait)
+        finally:
+            self._commit()
+
+
+class AsyncFollower(_BaseFollower):
+    """asyncio version of Follower, as an async iterator"""
+
+    def __init__(self, api, *args, **kwargs):
+        super().__init__(api, *args, **kwargs)
+        self._stopped = False
+        self._stop: Optional[asyncio.Event] = None  # 在事件循环中创建
+
+    def stop(self):
+        """stop following, also wakes up the waiting poll"""
+        self._stopped = True
+        if self._stop:
+            self._stop.set()
+
+    async def _latest(self) -> Optional[str]:
+        trxs = await self.api._get_encrypted_content(None, 1, reverse=True)
+        return trxs[0]["TrxId"] if isinstance(trxs, list) and trxs else None
+
+    async def _wait(self, seconds: float):
+        try:
+            await asyncio.wait_for(self._stop.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def __aiter__(self):
+        loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        if self._stopped:
+            return
+        if self.start_trx is None:
+            self.start_trx = await self._latest()
+        try:
+            while not self._stop.is_set():
+                try:
+                    encrypted_trxs = await self.api._get_encrypted_content(self.start_trx, self.num)
+                except Exception as err:  # aiohttp.ClientError, ValueError
+                    await self._wait(self._on_error(err))
+                    continue
+                new_trxs = self._new_trxs(encrypted_trxs)
+                trxs: List = []
+                if new_trxs:
+                    trxs = await loop.run_in_executor(
+                        None,
+                        self.api._decrypt_contents,
+                        new_trxs,
+                        self.senders,
+                        self.trx_types,
+                        self.lazy,
+                    )
+                for trx in trxs:
+                    yield trx
+                    self._handled(trx["TrxId"])
+                # 被 senders/trx_types 筛掉的 trx 也算已处理
+                self._handled(self.start_trx, len(new_trxs) - len(trxs))
+                wait = self._next_wait(len(new_trxs))
+                if wait is None:
+                    return
+                if wait:
+                    await self._wait(wait)
+        finally:
+            self._commit()
@@ -1,24 +1,84 @@
 """lightnode.py"""
 import base64
+import copy
 import json
 import logging
+import sys
+import threading
 import time
-from typing import Dict, List, Optional, Tuple, Union
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
 
 from mininode import utils
+from mininode._requests import HttpRequest
 from mininode.api.base import BaseAPI
-from mininode.crypto.account import check_private_key, private_key_to_pubkey
-from mininode.crypto.sign_trx import aes_encrypt, trx_decrypt, trx_encrypt
+from mininode.api.checkpoint import Checkpoint
+from mininode.api.follow import Follower
+from mininode.api.pager import ContentPager
+from mininode.api.trx_store import TrxStore
+from mininode.crypto.account import Signer, get_signer
+from mininode.crypto.lazy_trx import LazyTrx
+from mininode.crypto.sign_trx import (
+    aes_encrypt,
+    check_timestamp,
+    trx_decrypt,
+    trx_decrypt_many,
+    trx_encrypt,
+    trx_encrypt_many,
+)
+from mininode.utils import file as file_utils
+from mininode.utils.image import CHUNK_SIZE
+from mininode.utils.ttl_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+TRX_CACHE_MAX_BYTES = 32 * 1024 * 1024  # 32 mb，默认 cache 中 trx 的总大小上限
+
+
+def _is_trx(encrypted_trx) -> bool:
+    """only the trxs are cached, not the error responses of the fullnode"""
+    return isinstance(encrypted_trx, dict) and bool(encrypted_trx.get("TrxId"))
+
+
+def _trx_size(trx) -> int:
+    """bytes of a cached trx, by its encrypted Data or its decrypted Content"""
+    if not isinstance(trx, dict):
+        return sys.getsizeof(trx)
+    if "Data" in trx:
+        return len(trx["Data"])
+    # 解密后的内容可能带有 base64 图片，按序列化后的长度估算
+    return len(json.dumps(trx.get("Content"), ensure_ascii=False, default=str))
+
 
 class QuorumLightNodeAPI(BaseAPI):
     """the light node api for quorum"""
 
+    def __init__(
+        self,
+        http: HttpRequest,
+        group_id,
+        aes_key,
+        version: int = 1,
+        decrypt_executor: Optional[Executor] = None,
+        store: Optional[TrxStore] = None,
+        cache: Union[TTLCache, bool, None] = True,
+    ):
+        """decrypt_executor: the pool to decrypt the trxs of get_content, such as
+        ProcessPoolExecutor; trxs are decrypted in the calling thread if None.
+        store: the local store which saves the synced trxs, and is read by get_trx first.
+        cache: the in-process cache of get_trx and trx, a TTLCache of TRX_CACHE_MAX_BYTES if True,
+        off if False."""
+        super().__init__(http, group_id, aes_key, version=version)
+        self.decrypt_executor = decrypt_executor
+        self.store = store
+        if cache is True:
+            cache = TTLCache(max_bytes=TRX_CACHE_MAX_BYTES, sizeof=_trx_size)
+        # 空的 TTLCache 的 bool 值为 False，不能用 cache or None
+        self.cache = cache if isinstance(cache, TTLCache) else None
+
     def send_content(
         self,
-        private_key,
+        private_key: Union[str, int, bytes, Signer],
         content: Optional[str] = None,
         name: Optional[str] = None,
         images: Optional[List] = None,
@@ -39,7 +99,7 @@ class QuorumLightNodeAPI(BaseAPI):
 
     def edit_trx(
         self,
-        private_key: Union[str, int, bytes],
+        private_key: Union[str, int, bytes, Signer],
         trx_id: str,
         check_sender: bool = False,
         content: Optional[str] = None,
@@ -49,11 +109,26 @@ class QuorumLightNodeAPI(BaseAPI):
     ):
         """edit trx content, which is to send a new trx but connected to the old trx."""
         if check_sender:
-            sender = self.get_trx(trx_id).get("SenderPubkey")
-            user = private_key_to_pubkey(private_key)
-            if user != sender:
-                raise ValueError("You are not the sender of the trx, you can't edit it.")
+            self._check_sender(private_key, self.get_trx(trx_id))
+        obj = self._edit_obj(trx_id, content=content, name=name, images=images)
+        return self.send_trx(private_key, obj=obj, timestamp=timestamp)
+
+    @staticmethod
+    def _check_sender(private_key: Union[str, int, bytes, Signer], encrypted_trx: Dict):
+        """raise if the private_key is not the sender of the encrypted trx"""
+        sender = encrypted_trx.get("SenderPubkey")
+        user = get_signer(private_key).pubkey
+        if user != sender:
+            raise ValueError("You are not the sender of the trx, you can't edit it.")
 
+    @staticmethod
+    def _edit_obj(
+        trx_id: str,
+        content: Optional[str] = None,
+        name: Optional[str] = None,
+        images: Optional[List] = None,
+    ) -> Dict:
+        """init the obj of edit trx"""
         if not (content or images or name):
             raise ValueError("param content or images or name is required")
         obj = {
@@ -66,11 +141,11 @@ class QuorumLightNodeAPI(BaseAPI):
             obj["name"] = name
         if images:
             obj["image"] = utils.pack_images(images)
-        return self.send_trx(private_key, obj=obj, timestamp=timestamp)
+        return obj
 
     def del_trx(
         self,
-        private_key: Union[str, int, bytes],
+        private_key: Union[str, int, bytes, Signer],
         trx_id: str,
         timestamp: Union[str, int, float, None] = None,
     ):
@@ -80,7 +155,7 @@ class QuorumLightNodeAPI(BaseAPI):
 
     def reply_trx(
         self,
-        private_key: Union[str, int, bytes],
+        private_key: Union[str, int, bytes, Signer],
         trx_id: str,
         content: Optional[str] = None,
         images: Optional[List] = None,
@@ -101,7 +176,7 @@ class QuorumLightNodeAPI(BaseAPI):
 
     def like(
         self,
-        private_key: Union[str, int, bytes],
+        private_key: Union[str, int, bytes, Signer],
         trx_id: str,
         like_type: str = "Like",
         timestamp: Union[str, int, float, None] = None,
@@ -114,7 +189,7 @@ class QuorumLightNodeAPI(BaseAPI):
 
     def update_profile(
         self,
-        private_key: Union[str, int, bytes],
+        private_key: Union[str, int, bytes, Signer],
         name: Optional[str] = None,
         image: Optional[str] = None,
         timestamp: Union[str, int, float, None] = None,
@@ -131,7 +206,7 @@ class QuorumLightNodeAPI(BaseAPI):
 
     def send_trx(
         self,
-        private_key: Union[str, int, bytes],
+        private_key: Union[str, int, bytes, Signer],
         obj: Optional[Dict] = None,
         person: Optional[Dict] = None,
         timestamp: Union[str, int, float, None] = None,
@@ -140,32 +215,255 @@ class QuorumLightNodeAPI(BaseAPI):
         obj/person: dict
         timestamp:2022-10-05 12:34
         """
+        trx = self._pack_trx(private_key, obj=obj, person=person, timestamp=timestamp)
+        return self._post(endpoint=f"/node/trx/{self.group_id}", payload=trx)
+
+    def _pack_trx(
+        self,
+        private_key: Union[str, int, bytes, Signer],
+        obj: Optional[Dict] = None,
+        person: Optional[Dict] = None,
+        timestamp: Union[str, int, float, None] = None,
+    ) -> Dict:
+        """sign and encrypt obj/person as the payload of send_trx"""
+        trx = trx_encrypt(
+            self.group_id,
+            self.aes_key,
+            get_signer(private_key),
+            obj=obj,
+            person=person,
+            timestamp=self._parse_timestamp(timestamp),
+            version=self.version,
+        )
+        return trx
 
-        private_key = check_private_key(private_key)
+    @staticmethod
+    def _parse_timestamp(timestamp: Union[str, int, float, None] = None):
+        """parse the timestamp string as 2022-10-05 12:34"""
         # 此处开放了时间戳的自定义
         if timestamp and isinstance(timestamp, str):
             timestamp = timestamp.replace("/", "-")[:16]
             timestamp = time.mktime(time.strptime(timestamp, "%Y-%m-%d %H:%M"))
-        trx = trx_encrypt(
+        return timestamp
+
+    def encrypt_many(
+        self,
+        items: List[Dict],
+        private_key: Union[str, int, bytes, Signer, None] = None,
+        max_workers: Optional[int] = None,
+        executor: Optional[Executor] = None,
+    ) -> List:
+        """sign and encrypt many trxs across a process pool
+
+        items: list of dict as {"obj": obj} or {"person": person}, with optional
+            "private_key" and "timestamp"; private_key is the default key of the items.
+        executor: reuse a process pool between batches, or a new one is created.
+
+        returns the payloads of send_trx in the order of items; if an item fails,
+        its exception is returned in its place and the others go on.
+        """
+        results = [None] * len(items)
+        todo = []
+        signers = {}  # derive the key material once for each private key of the batch
+        for i, item in enumerate(items):
+            try:
+                _key = item.get("private_key", private_key)
+                if _key not in signers:
+                    signers[_key] = get_signer(_key)
+                _item = {
+                    "private_key": signers[_key],
+                    "obj": item.get("obj"),
+                    "person": item.get("person"),
+                    "timestamp": self._parse_timestamp(item.get("timestamp")),
+                }
+            except Exception as err:
+                results[i] = err
+                continue
+            todo.append((i, _item))
+
+        trxs = trx_encrypt_many(
             self.group_id,
             self.aes_key,
-            private_key,
-            obj=obj,
-            person=person,
-            timestamp=timestamp,
+            [item for _, item in todo],
             version=self.version,
+            max_workers=max_workers,
+            executor=executor,
+        )
+        for (i, _), trx in zip(todo, trxs):
+            results[i] = trx
+        return results
+
+    def send_many(
+        self,
+        items: List[Dict],
+        private_key: Union[str, int, bytes, Signer, None] = None,
+        max_workers: Optional[int] = None,
+        executor: Optional[Executor] = None,
+    ) -> List:
+        """sign many trxs across a process pool as encrypt_many, then send them in order.
+
+        returns the responses in the order of items; if an item fails,
+        its exception is returned in its place and the others go on.
+        """
+        results = []
+        for trx in self.encrypt_many(items, private_key, max_workers, executor):
+            if isinstance(trx, Exception):
+                results.append(trx)
+                continue
+            try:
+                results.append(self._post(endpoint=f"/node/trx/{self.group_id}", payload=trx))
+            except Exception as err:
+                logger.warning("send_many error: %s", err)
+                results.append(err)
+        return results
+
+    def upload_file(
+        self,
+        private_key: Union[str, int, bytes, Signer],
+        file: Union[str, BinaryIO],
+        name: Optional[str] = None,
+        chunk_size: int = CHUNK_SIZE,
+        max_workers: int = 4,
+        timestamp: Union[str, int, float, None] = None,
+    ) -> Dict:
+        """upload a file as trxs of chunks named seg-1, seg-2..., sent concurrently,
+        then a fileinfo trx with the order, size and sha256 of the chunks.
+
+        file: the file path or file object, which is read chunk by chunk;
+            at most max_workers * 2 chunks are held in memory.
+
+        returns the fileinfo, with the trx_id of every segment and of the fileinfo trx;
+        download_file takes the fileinfo or its trx_id.
+        """
+        signer = get_signer(private_key)
+        fileinfo = {"name": file_utils.file_name(file, name)}
+        pending = threading.BoundedSemaphore(max_workers * 2)
+        futures = []
+        with ThreadPoolExecutor(max_workers) as executor:
+            for index, chunk in file_utils.iter_segments(file, fileinfo, chunk_size):
+                pending.acquire()
+                future = executor.submit(self._send_segment, signer, index, chunk, timestamp)
+                future.add_done_callback(lambda _: pending.release())
+                futures.append(future)
+            fileinfo["segments"] = [future.result() for future in futures]
+        resp = self.send_trx(signer, obj=file_utils.fileinfo_obj(fileinfo), timestamp=timestamp)
+        fileinfo["trx_id"] = self._sent_trx_id(resp, file_utils.FILEINFO_NAME)
+        return fileinfo
+
+    def _send_segment(self, signer: Signer, index: int, chunk: bytes, timestamp=None) -> Dict:
+        """send the index-th chunk, return its item of fileinfo"""
+        resp = self.send_trx(signer, obj=file_utils.segment_obj(index, chunk), timestamp=timestamp)
+        return file_utils.segment_info(
+            index, chunk, self._sent_trx_id(resp, f"{file_utils.SEGMENT_PREFIX}{index}")
         )
-        return self._post(endpoint=f"/node/trx/{self.group_id}", payload=trx)
+
+    @staticmethod
+    def _sent_trx_id(resp, name: str) -> str:
+        """the trx_id of the response of send_trx, raise if it fails"""
+        trx_id = resp.get("trx_id") if isinstance(resp, dict) else None
+        if not trx_id:
+            raise ValueError(f"send {name} failed: {resp}")
+        return trx_id
+
+    def download_file(
+        self,
+        fileinfo: Union[str, Dict],
+        file_dir: str = ".",
+        file_path: Optional[str] = None,
+        max_workers: int = 4,
+    ) -> str:
+        """download the file uploaded by upload_file.
+
+        fileinfo: the fileinfo returned by upload_file, or the trx_id of the fileinfo trx.
+        file_path: where to save the file, or it is saved under file_dir by its name.
+
+        the segments are fetched and decrypted in parallel and written at their offsets,
+        each one and then the whole file are checked by sha256; returns the file path.
+        """
+        if isinstance(fileinfo, str):
+            fileinfo = file_utils.parse_fileinfo(self.trx(fileinfo))
+        path = file_utils.download_path(fileinfo, file_dir, file_path)
+        lock = threading.Lock()
+
+        def _write(write_f, offset: int, segment: Dict):
+            # 分段的 trx 体积大且只读一次，不经过 cache
+            trx = trx_decrypt(self.aes_key, self._fetch_trx(segment["trx_id"]))
+            data = file_utils.segment_bytes(trx, segment)
+            with lock:
+                write_f.seek(offset)
+                write_f.write(data)
+
+        with file_utils.open_download(path, fileinfo) as write_f:
+            with ThreadPoolExecutor(max_workers) as executor:
+                futures = [
+                    executor.submit(_write, write_f, offset, segment)
+                    for offset, segment in file_utils.segment_offsets(fileinfo)
+                ]
+                for future in futures:
+                    future.result()
+        return path
 
     def get_trx(self, trx_id: str):
-        """get encrpyted trx"""
-        return self._get(endpoint=f"/trx/{self.group_id}/{trx_id}")
+        """get encrpyted trx, from the cache and the local store first if they are set;
+        a copy of the cached trx is returned, so the caller may modify it"""
+        if self.cache is None:
+            return self._fetch_trx(trx_id)
+        encrypted_trx = self.cache.get_or_load(
+            (self.group_id, "get_trx", trx_id), lambda: self._fetch_trx(trx_id), _is_trx
+        )
+        return copy.deepcopy(encrypted_trx)
+
+    def _fetch_trx(self, trx_id: str):
+        """get encrpyted trx from the local store, or from the fullnode"""
+        if self.store:
+            encrypted_trx = self.store.get(self.group_id, trx_id)
+            if encrypted_trx:
+                return encrypted_trx
+        encrypted_trx = self._get(endpoint=f"/trx/{self.group_id}/{trx_id}")
+        self._save_trxs([encrypted_trx])
+        return encrypted_trx
+
+    def _save_trxs(self, encrypted_trxs):
+        """save the trxs got from the fullnode to the local store if it is set"""
+        if self.store and isinstance(encrypted_trxs, list):
+            self.store.put_many(self.group_id, encrypted_trxs)
+
+    def get_local_contents(
+        self,
+        senders: Optional[List] = None,
+        trx_types: Optional[Tuple] = None,
+        since: Union[str, int, float, None] = None,
+        until: Union[str, int, float, None] = None,
+        num: Optional[int] = None,
+        reverse: bool = False,
+        lazy: bool = False,
+    ) -> List:
+        """the decrypted trxs saved in the local store, without requesting the fullnode;
+        since/until are timestamps as send_trx, trx_types are the types of get_trx_type"""
+        if not self.store:
+            raise ValueError("the local store is not set")
+        encrypted_trxs = self.store.query(
+            self.group_id,
+            senders=senders,
+            trx_types=trx_types,
+            since=check_timestamp(self._parse_timestamp(since)) if since else None,
+            until=check_timestamp(self._parse_timestamp(until)) if until else None,
+            num=num,
+            reverse=reverse,
+            aes_key=self.aes_key,
+        )
+        return self._decrypt_contents(encrypted_trxs, lazy=lazy)
 
     def trx(self, trx_id: str):
-        """get decrypted trx"""
-        encrypted_trx = self.get_trx(trx_id)
-        trx = trx_decrypt(self.aes_key, encrypted_trx)
-        return trx
+        """get decrypted trx, through the cache if it is set; a copy of the cached trx is
+        returned, so the caller may modify it"""
+        if self.cache is None:
+            return trx_decrypt(self.aes_key, self.get_trx(trx_id))
+        trx = self.cache.get_or_load(
+            (self.group_id, "trx", trx_id),
+            lambda: trx_decrypt(self.aes_key, self.get_trx(trx_id)),
+        )
+        return copy.deepcopy(trx)
 
     def get_content(
         self,
@@ -175,8 +473,25 @@ class QuorumLightNodeAPI(BaseAPI):
         include_start_trx: bool = False,
         senders: Optional[List] = None,
         trx_types: Optional[Tuple] = None,
+        lazy: bool = False,
     ):
-        """get content"""
+        """get content
+
+        lazy: return LazyTrx which is decrypted only when its TypeUrl or Content is accessed
+        """
+        payload = self._content_payload(start_trx, num, reverse, include_start_trx)
+        encypted_trxs = self._post(f"/node/groupctn/{self.group_id}", payload=payload)
+        self._save_trxs(encypted_trxs)
+        return self._decrypt_contents(encypted_trxs, senders, trx_types, lazy)
+
+    def _content_payload(
+        self,
+        start_trx: Optional[str] = None,
+        num: int = 20,
+        reverse: bool = False,
+        include_start_trx: bool = False,
+    ) -> Dict:
+        """init the payload of get_content"""
         # TODO:如果把 senders 传入 quorum，会导致拿不到数据，或数据容易中断，所以实现时拿了全部数据，再筛选senders
 
         params = {
@@ -192,8 +507,16 @@ class QuorumLightNodeAPI(BaseAPI):
         payload = {
             "Req": self._pack_obj({"Req": params}),
         }
-        encypted_trxs = self._post(f"/node/groupctn/{self.group_id}", payload=payload)
+        return payload
 
+    def _decrypt_contents(
+        self,
+        encypted_trxs: List,
+        senders: Optional[List] = None,
+        trx_types: Optional[Tuple] = None,
+        lazy: bool = False,
+    ) -> List:
+        """decrypt the trxs of get_content and filter them by senders and trx_types"""
         # check trx_types:
         if trx_types:
             for i in trx_types:
@@ -202,93 +525,116 @@ class QuorumLightNodeAPI(BaseAPI):
                         "Invalid trx_type. param trx_type is one of %s",
                         str(utils.CLIENT_TRX_TYPES),
                     )
-        # chooce trxs:
-        try:
-            trxs = [trx_decrypt(self.aes_key, i) for i in encypted_trxs]
-            if senders:
-                trxs = [i for i in trxs if i["Publisher"] in senders]
+        if not isinstance(encypted_trxs, list):
+            logger.warning("get_content error: %s", encypted_trxs)
+            return encypted_trxs
+        # chooce trxs: 先按 SenderPubkey 筛选再解密；解密失败的 trx 标记为 encrypted，不影响同页的其它 trx
+        if senders:
+            senders = set(senders)
+            encypted_trxs = [i for i in encypted_trxs if i.get("SenderPubkey") in senders]
+        # trx_types 在 protobuf 上判断，不符合的 trx 不做 MessageToDict 转换
+        if lazy:
+            trxs = [LazyTrx(self.aes_key, i) for i in encypted_trxs]
             if trx_types:
-                trxs = [trx for trx in trxs if utils.get_trx_type(trx) in trx_types]
-        except Exception as err:
-            logger.warning("get_content error: %s", err)
-            trxs = encypted_trxs
-        return trxs
-
-    def __get_all_contents(
-        self,
-        start_trx: Optional[str] = None,
+                trxs = [trx for trx in trxs if trx.trx_type() in trx_types]
+            return trxs
+        return trx_decrypt_many(self.aes_key, encypted_trxs, self.decrypt_executor, trx_types)
+
+    def content_pager(self, start_trx: Optional[str] = None, **kwargs) -> ContentPager:
+        """the pager of all contents after start_trx, with stats of pages, bytes and trx/s.
+        kwargs: senders, trx_types, lazy, min_num, max_num, target_latency, max_page_bytes,
+        stall_limit, checkpoint, error_limit, retry_interval of ContentPager"""
+        return ContentPager(self, start_trx=start_trx, **kwargs)
+
+    def _get_encrypted_content(
+        self, start_trx: Optional[str] = None, num: int = 20, reverse: bool = False
     ):
-        """get all contents as a generator"""
-        hightest_trxid = None
-        _hightest_trxs = self.get_content(reverse=True, include_start_trx=True, num=1)
-        if _hightest_trxs:
-            hightest_trxid = _hightest_trxs[0].get("TrxId")
-        trxs = self.get_content(start_trx=start_trx, num=20)
-        checked_trxids = []
-        num = 20
-        max_try = 30
-        while start_trx != hightest_trxid and max_try > 0:  # 应该用区块高度来判断，而不是是否取得数据。
-            if start_trx in checked_trxids:
-                num += 20
-                max_try -= 1
-            else:
-                checked_trxids.append(start_trx)
-                max_try = 30
-            for trx in trxs:
-                start_trx = trx["TrxId"]
-                yield trx
-            trxs = self.get_content(start_trx=start_trx, num=num)
+        """get the encrypted trxs of get_content"""
+        payload = self._content_payload(start_trx, num, reverse)
+        encrypted_trxs = self._post(f"/node/groupctn/{self.group_id}", payload=payload)
+        self._save_trxs(encrypted_trxs)
+        return encrypted_trxs
+
+    def follow(self, start_trx: Optional[str] = None, **kwargs) -> Follower:
+        """follow the new trxs of the group as they arrive, from start_trx or the newest trx.
+        kwargs: senders, trx_types, lazy, num, min_interval, max_interval, backoff, max_idle,
+        max_seen, checkpoint of Follower"""
+        return Follower(self, start_trx=start_trx, **kwargs)
 
     def get_all_contents(
         self,
         start_trx: Optional[str] = None,
         senders: Optional[List] = None,
         trx_types: Optional[Tuple] = None,
+        lazy: bool = False,
+        checkpoint: Optional[Checkpoint] = None,
     ):
-        """get all contents as a generator"""
+        """get all contents as a generator
+
+        lazy: yield LazyTrx which is decrypted only when its TypeUrl or Content is accessed
+        checkpoint: resume from its cursor if start_trx is None, and commit the handled trxs
+        """
         # 如果把 senders 传入 quorum，会导致拿不到数据，或数据容易中断，所以实现时拿了全部数据，再筛选senders
-        trx_types = trx_types or []
-        senders = senders or []
-        for trx in self.__get_all_contents(start_trx):
-            flag1 = (utils.get_trx_type(trx) in trx_types) or (not trx_types)
-            flag2 = (trx.get("Publisher", "") in senders) or (not senders)
-            if flag1 and flag2:
-                yield trx
+        yield from self.content_pager(
+            start_trx, senders=senders, trx_types=trx_types, lazy=lazy, checkpoint=checkpoint
+        )
 
     def get_profiles(
         self,
         types=("name", "image"),
         senders: Optional[List] = None,
         users: Optional[Dict] = None,  # 已有的data，传入可用来更新数据
+        checkpoint: Optional[Checkpoint] = None,
     ):
-        """get profiles of users"""
+        """get profiles of users
+
+        checkpoint: resume from its cursor instead of users["progress_tid"] if it is not given
+        """
         users = users or {}
         progress_tid = users.get("progress_tid", None)
         trxs = self.get_all_contents(
             start_trx=progress_tid,
             trx_types=("person",),
             senders=senders,
+            checkpoint=checkpoint,
         )
 
         for trx in trxs:
             progress_tid = trx["TrxId"]
-            trx_content = trx.get("Content", {})
-            pubkey = trx["Publisher"]
-
-            if pubkey not in users:
-                users[pubkey] = {}
-            for key in types:
-                if key in trx_content:
-                    users[pubkey][key] = trx_content[key]
+            self._update_profile(users, trx, types)
 
         users["progress_tid"] = progress_tid
         return users
 
+    @staticmethod
+    def _update_profile(users: Dict, trx: Dict, types=("name", "image")):
+        """update users with the profile of a person trx"""
+        trx_content = trx.get("Content", {})
+        pubkey = trx["Publisher"]
+
+        if pubkey not in users:
+            users[pubkey] = {}
+        for key in types:
+            if key in trx_content:
+                users[pubkey][key] = trx_content[key]
+
     def trx_retweet_params(self, trx: Dict, nicknames: Optional[Dict] = None, **kwargs) -> Dict:
         """trans from trx to an object of new trx to send to chain.
         Returns:
             obj: object of new trx,can be used as: self.send_note(obj=obj).
         """
+        refer_tid = self._refer_trx_id(trx)
+        refer_trx = None
+        if refer_tid:
+            refer_trx = self.trx(trx_id=refer_tid)
+        params = utils.init_trx_retweet_params(
+            trx=trx, refer_trx=refer_trx, nicknames=nicknames, **kwargs
+        )
+        return params
+
+    @staticmethod
+    def _refer_trx_id(trx: Dict) -> Optional[str]:
+        """get the trx_id referred by a reply or like trx"""
         # 从trx中筛选出引用的 trx_id
         refer_tid = None
 
@@ -297,13 +643,7 @@ class QuorumLightNodeAPI(BaseAPI):
             refer_tid = trx["Content"]["inreplyto"]["trxid"]
         elif trxtype in ("like", "dislike"):
             refer_tid = trx["Content"]["id"]
-        refer_trx = None
-        if refer_tid:
-            refer_trx = self.trx(trx_id=refer_tid)
-        params = utils.init_trx_retweet_params(
-            trx=trx, refer_trx=refer_trx, nicknames=nicknames, **kwargs
-        )
-        return params
+        return refer_tid
 
     def _pack_obj(self, obj: Dict[str, str]) -> str:
         """pack obj with group chiperkey and return a string"""
@@ -314,11 +654,15 @@ class QuorumLightNodeAPI(BaseAPI):
 
     def _get_chaindata(self, obj: Dict, req_type: str):
         """base api of get chaindata"""
-        payload = {
+        payload = self._chaindata_payload(obj, req_type)
+        return self._post(endpoint=f"/node/getchaindata/{self.group_id}", payload=payload)
+
+    def _chaindata_payload(self, obj: Dict, req_type: str) -> Dict:
+        """init the payload of get chaindata"""
+        return {
             "Req": self._pack_obj(obj),
             "ReqType": req_type,
         }
-        return self._post(endpoint=f"/node/getchaindata/{self.group_id}", payload=payload)
 
     def get_group_info(self):
         """get group info"""
@@ -0,0 +1,273 @@
+"""outbox.py: a durable outbox of trxs in SQLite, signed just before they are sent"""
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Union
+
+from mininode.crypto.account import Signer, get_signer
+from mininode.crypto.sign_trx import data_encrypt, pack_obj
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    trx_id TEXT PRIMARY KEY,
+    group_id TEXT NOT NULL,
+    pubkey TEXT NOT NULL,
+    data BLOB NOT NULL,
+    timestamp INTEGER,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_try REAL NOT NULL,
+    created REAL NOT NULL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_status ON outbox (status, next_try);
+"""
+
+
+class Outbox:
+    """trxs are stored unsigned in SQLite, and signed by the registered Signer of their
+    sender only when they are sent; a trx which fails is signed again for every retry,
+    so it never expires, and keeps its TrxId, so the fullnode takes it as the same trx.
+
+    private keys are never stored: after a restart, register the signers again and
+    flush to send the trxs left in the outbox.
+
+    flush claims the trxs it sends, so concurrent flushes, of this outbox or of others on
+    the same file, never send a trx twice; the claim of a flush which crashed expires after
+    claim_timeout seconds, and the trx is sent again with the same TrxId.
+    """
+
+    def __init__(
+        self,
+        api,
+        path: str = "mininode_outbox.db",
+        max_attempts: int = 10,
+        backoff: float = 1.0,
+        max_backoff: float = 300.0,
+        claim_timeout: float = 300.0,
+    ):
+        """
+        Args:
+            api (QuorumLightNodeAPI): the api to send the trxs.
+            path (str, optional): the SQLite file of the outbox.
+            max_attempts (int, optional): attempts to send a trx before it is marked failed.
+            backoff (float, optional): seconds to wait before the first retry, doubled by
+                every following one.
+            max_backoff (float, optional): upper limit of the wait between retries.
+            claim_timeout (float, optional): seconds a trx claimed by a flush is not sent by
+                the others, it should be longer than sending a trx takes.
+        """
+        self.api = api
+        self.path = path
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.claim_timeout = claim_timeout
+        self._signers: Dict[str, Signer] = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._thread = None
+        self._stop = threading.Event()
+
+    def register(self, private_key: Union[str, int, bytes, Signer]) -> str:
+        """register the signer of private key in memory, return its pubkey"""
+        signer = get_signer(private_key)
+        self._signers[signer.pubkey] = signer
+        return signer.pubkey
+
+    def put(
+        self,
+        private_key: Union[str, int, bytes, Signer],
+        obj: Optional[Dict] = None,
+        person: Optional[Dict] = None,
+        timestamp: Union[str, int, float, None] = None,
+        trx_id: Optional[str] = None,
+    ) -> str:
+        """store a trx of obj/person to send, return its TrxId, the idempotency key
+
+        timestamp: the timestamp of the trx, or the time when it is signed if None.
+        trx_id: put the same trx_id again is ignored, the trx is stored only once.
+        """
+        pubkey = self.register(private_key)
+        trx_id = trx_id or str(uuid.uuid4())
+        timestamp = self.api._parse_timestamp(timestamp) if timestamp else None
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO outbox (trx_id, group_id, pubkey, data, timestamp,"
+                " status, next_try, created) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    trx_id,
+                    self.api.group_id,
+                    pubkey,
+                    pack_obj(obj, person),
+                    timestamp,
+                    PENDING,
+                    now,
+                    now,
+                ),
+            )
+        return trx_id
+
+    def _claim(self, limit: Optional[int] = None) -> List:
+        """claim the trxs of the group which are due, or whose claim has expired,
+        in the order they were put"""
+        now = time.time()
+        with self._lock:
+            # BEGIN IMMEDIATE 取得写锁，其它连接不能同时认领同一批 trx
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT trx_id, pubkey, data, timestamp, attempts FROM outbox"
+                    " WHERE group_id = ? AND status IN (?, ?) AND next_try <= ?"
+                    " ORDER BY created LIMIT ?",
+                    (self.api.group_id, PENDING, SENDING, now, -1 if limit is None else limit),
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE outbox SET status = ?, next_try = ? WHERE trx_id = ?",
+                    [(SENDING, now + self.claim_timeout, row[0]) for row in rows],
+                )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return rows
+
+    def _release(self, trx_id: str):
+        """put the claimed trx back to pending, without an attempt"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = ?, next_try = ? WHERE trx_id = ?",
+                (PENDING, time.time(), trx_id),
+            )
+
+    def flush(self, limit: Optional[int] = None) -> Dict:
+        """send the pending trxs which are due, return the counts of sent, retry, failed
+        and skipped (the signer is not registered)"""
+        counts = {SENT: 0, "retry": 0, FAILED: 0, "skipped": 0}
+        for trx_id, pubkey, data, timestamp, attempts in self._claim(limit):
+            signer = self._signers.get(pubkey)
+            if signer is None:
+                self._release(trx_id)
+                counts["skipped"] += 1
+                continue
+            try:
+                # 每次发送前重新签名，时间戳与过期时间随之更新，TrxId 不变
+                trx = data_encrypt(
+                    self.api.group_id,
+                    self.api.aes_key,
+                    signer,
+                    data,
+                    timestamp=timestamp,
+                    version=self.api.version,
+                    trx_id=trx_id,
+                )
+                resp = self.api._post(endpoint=f"/node/trx/{self.api.group_id}", payload=trx)
+                if not (isinstance(resp, dict) and resp.get("trx_id")):
+                    raise ValueError(f"send trx failed: {resp}")
+            except Exception as err:
+                counts[self._retry(trx_id, attempts + 1, err)] += 1
+                continue
+            with self._lock:
+                self._conn.execute(
+                    "UPDATE outbox SET status = ?, attempts = ?, error = NULL WHERE trx_id = ?",
+                    (SENT, attempts + 1, trx_id),
+                )
+            counts[SENT] += 1
+        return counts
+
+    def _retry(self, trx_id: str, attempts: int, err: Exception) -> str:
+        """schedule the next try with backoff, or mark the trx failed"""
+        logger.warning("outbox send %s error: %s", trx_id, err)
+        status = FAILED if attempts >= self.max_attempts else PENDING
+        delay = min(self.backoff * 2 ** (attempts - 1), self.max_backoff)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = ?, attempts = ?, next_try = ?, error = ?"
+                " WHERE trx_id = ?",
+                (status, attempts, time.time() + delay, str(err), trx_id),
+            )
+        return FAILED if status == FAILED else "retry"
+
+    def retry_failed(self):
+        """put the failed trxs back to pending, to send them again"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = ?, attempts = 0, next_try = ?"
+                " WHERE group_id = ? AND status = ?",
+                (PENDING, time.time(), self.api.group_id, FAILED),
+            )
+
+    def purge(self, before: Optional[float] = None):
+        """delete the sent trxs, which were put before the unix time if given"""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM outbox WHERE status = ? AND created <= ?",
+                (SENT, time.time() if before is None else before),
+            )
+
+    def status(self, trx_id: str) -> Optional[Dict]:
+        """status, attempts and last error of the trx, None if it is not in the outbox"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, attempts, error FROM outbox WHERE trx_id = ?", (trx_id,)
+            ).fetchone()
+        return dict(zip(("status", "attempts", "error"), row)) if row else None
+
+    def stats(self) -> Dict:
+        """the number of trxs of the group by status, sending are those claimed by a flush"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM outbox WHERE group_id = ? GROUP BY status",
+                (self.api.group_id,),
+            ).fetchall()
+        stats = {PENDING: 0, SENDING: 0, SENT: 0, FAILED: 0}
+        stats.update(rows)
+        return stats
+
+    def start(self, interval: float = 1.0):
+        """flush in a background thread every interval seconds"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def _run():
+            while not self._stop.is_set():
+                try:
+                    self.flush()
+                except Exception as err:  # sqlite3.Error
+                    logger.warning("outbox flush error: %s", err)
+                self._stop.wait(interval)
+
+        self._thread = threading.Thread(target=_run, name="mininode-outbox", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """stop the background thread"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        """stop the background thread and close the database"""
+        self.stop()
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
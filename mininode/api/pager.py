@@ -0,0 +1,256 @@
+"""pager.py: page the trxs of a group with adaptive page size"""
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from mininode.api.checkpoint import Checkpoint
+
+logger = logging.getLogger(__name__)
+
+
+class PagerStats:
+    """the progress of a pager"""
+
+    __slots__ = ("pages", "trxs", "bytes", "errors", "num", "started", "finished")
+
+    def __init__(self, num: int):
+        self.pages = 0
+        self.trxs = 0
+        self.bytes = 0
+        self.errors = 0
+        self.num = num
+        self.started = time.monotonic()
+        self.finished = None
+
+    @property
+    def elapsed(self) -> float:
+        """seconds since the pager started"""
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def trx_per_sec(self) -> float:
+        """trxs fetched per second"""
+        return self.trxs / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self) -> Dict:
+        """stats as dict"""
+        return {
+            "pages": self.pages,
+            "trxs": self.trxs,
+            "bytes": self.bytes,
+            "errors": self.errors,
+            "num": self.num,
+            "elapsed": self.elapsed,
+            "trx_per_sec": self.trx_per_sec,
+        }
+
+    def __repr__(self):
+        return f"PagerStats({self.as_dict()})"
+
+
+class _BasePager:
+    """the cursor and page size of a pager, in constant memory"""
+
+    def __init__(
+        self,
+        api,
+        start_trx: Optional[str] = None,
+        senders: Optional[List] = None,
+        trx_types: Optional[Tuple] = None,
+        lazy: bool = False,
+        min_num: int = 20,
+        max_num: int = 500,
+        target_latency: float = 1.0,
+        max_page_bytes: int = 4 * 1024 * 1024,
+        stall_limit: int = 2,
+        checkpoint: Optional[Checkpoint] = None,
+        error_limit: int = 5,
+        retry_interval: float = 0.5,
+    ):
+        """
+        Args:
+            api: the QuorumLightNodeAPI or AsyncQuorumLightNodeAPI to fetch and decrypt trxs.
+            start_trx (str, optional): the cursor, trxs after it are fetched.
+            senders (list, optional): only the trxs of senders are decrypted and yielded.
+            trx_types (tuple, optional): only the trxs of trx_types are yielded.
+            lazy (bool, optional): yield LazyTrx, decrypted only when its Content is accessed.
+            min_num, max_num (int, optional): the bounds of the page size.
+            target_latency (float, optional): seconds per page to aim at.
+            max_page_bytes (int, optional): upper limit of the bytes of a page.
+            stall_limit (int, optional): stop after so many pages of max_num in a row without
+                new trxs; an empty page of fewer trxs doubles the page size at once instead.
+            checkpoint (Checkpoint, optional): resume from its cursor if start_trx is None,
+                and commit the handled trxs to it.
+            error_limit (int, optional): stop after so many error responses in a row.
+            retry_interval (float, optional): seconds to wait before fetching the same cursor
+                again after an empty page of max_num or an error, doubled each time in a row.
+        """
+        if checkpoint and start_trx is None:
+            start_trx = checkpoint.load()
+        self.api = api
+        self.start_trx = start_trx
+        self.senders = set(senders) if senders else None
+        self.trx_types = trx_types
+        self.lazy = lazy
+        self.min_num = min_num
+        self.max_num = max_num
+        self.target_latency = target_latency
+        self.max_page_bytes = max_page_bytes
+        self.stall_limit = stall_limit
+        self.checkpoint = checkpoint
+        self.error_limit = error_limit
+        self.retry_interval = retry_interval
+        self.stats = PagerStats(min_num)
+        self._stalls = 0
+        self._errors = 0
+        self._wait = 0.0
+
+    def _handled(self, trx_id: Optional[str], count: int = 1):
+        """the consumer has handled count trxs up to trx_id"""
+        if self.checkpoint:
+            self.checkpoint.advance(trx_id, count)
+
+    def _handled_page(self, next_start_trx: Optional[str], encrypted_trxs, trxs: List):
+        """the trxs of the page are handled, with those filtered by senders and trx_types"""
+        skipped = len(encrypted_trxs) - len(trxs) if isinstance(encrypted_trxs, list) else 0
+        self._handled(next_start_trx, skipped)
+
+    def _commit(self):
+        if self.checkpoint:
+            self.checkpoint.commit()
+
+    def _on_page(self, encrypted_trxs, latency: float) -> Optional[str]:
+        """update the stats and page size by the fetched page, and the seconds to wait
+        before fetching the next; return the cursor of the next page, or None to stop"""
+        self._wait = 0.0
+        if not isinstance(encrypted_trxs, list):
+            # 出错的响应不代表没有新的 trx，退避后重试同一游标
+            logger.warning("get_content error: %s", encrypted_trxs)
+            self.stats.errors += 1
+            self._errors += 1
+            if self._errors >= self.error_limit:
+                self.stats.finished = time.monotonic()
+                return None
+            self._wait = self._backoff(self._errors)
+            return self.start_trx
+        self._errors = 0
+        num = self.stats.num
+        count = len(encrypted_trxs)
+        size = sum(len(i.get("Data") or "") for i in encrypted_trxs)
+        self.stats.pages += 1
+        self.stats.trxs += count
+        self.stats.bytes += size
+
+        if count == 0:
+            if num < self.max_num:
+                # fullnode 会在历史中间返回空窗口，加大页大小才能越过；
+                # 应该用区块高度来判断是否已取完，而不是是否取得数据
+                self.stats.num = min(num * 2, self.max_num)
+                return self.start_trx
+            self._stalls += 1
+            if self._stalls >= self.stall_limit:
+                self.stats.finished = time.monotonic()
+                return None
+            self._wait = self._backoff(self._stalls)
+            return self.start_trx
+        self._stalls = 0
+
+        if count >= num:
+            # 整页：按目标耗时缩放页大小，并受单页字节数限制
+            scale = min(max(self.target_latency / max(latency, 1e-3), 0.5), 2.0)
+            num = int(num * scale)
+            num = min(num, self.max_page_bytes * count // max(size, 1))
+            self.stats.num = max(self.min_num, min(num, self.max_num))
+        return encrypted_trxs[-1]["TrxId"]
+
+    def _backoff(self, retries: int) -> float:
+        return self.retry_interval * 2 ** (retries - 1)
+
+
+class ContentPager(_BasePager):
+    """iterate the decrypted trxs of a group after start_trx, until no new trxs.
+
+    page size follows the observed latency and payload size; the next page is
+    fetched while this one is decrypted; stats shows pages, bytes and trx/s.
+    """
+
+    def _fetch(self, start_trx: Optional[str], num: int, wait: float = 0.0):
+        if wait:
+            time.sleep(wait)
+        start = time.monotonic()
+        encrypted_trxs = self.api._get_encrypted_content(start_trx, num)
+        return encrypted_trxs, time.monotonic() - start
+
+    def __iter__(self):
+        with ThreadPoolExecutor(max_workers=1) as prefetcher:
+            try:
+                encrypted_trxs, latency = self._fetch(self.start_trx, self.stats.num)
+                while True:
+                    next_start_trx = self._on_page(encrypted_trxs, latency)
+                    if next_start_trx is None:
+                        return
+                    _next = prefetcher.submit(
+                        self._fetch, next_start_trx, self.stats.num, self._wait
+                    )
+                    trxs = []
+                    if encrypted_trxs and isinstance(encrypted_trxs, list):
+                        trxs = self.api._decrypt_contents(
+                            encrypted_trxs, self.senders, self.trx_types, self.lazy
+                        )
+                    for trx in trxs:
+                        self.start_trx = trx["TrxId"]
+                        yield trx
+                        self._handled(trx["TrxId"])
+                    self._handled_page(next_start_trx, encrypted_trxs, trxs)
+                    self.start_trx = next_start_trx
+                    encrypted_trxs, latency = _next.result()
+            finally:
+                self._commit()
+
+
+class AsyncContentPager(_BasePager):
+    """asyncio version of ContentPager, as an async iterator"""
+
+    async def _fetch(self, start_trx: Optional[str], num: int, wait: float = 0.0):
+        if wait:
+            await asyncio.sleep(wait)
+        start = time.monotonic()
+        encrypted_trxs = await self.api._get_encrypted_content(start_trx, num)
+        return encrypted_trxs, time.monotonic() - start
+
+    async def __aiter__(self):
+        loop = asyncio.get_running_loop()
+        try:
+            encrypted_trxs, latency = await self._fetch(self.start_trx, self.stats.num)
+            while True:
+                next_start_trx = self._on_page(encrypted_trxs, latency)
+                if next_start_trx is None:
+                    return
+                _next = asyncio.ensure_future(
+                    self._fetch(next_start_trx, self.stats.num, self._wait)
+                )
+                try:
+                    trxs: List = []
+                    if encrypted_trxs and isinstance(encrypted_trxs, list):
+                        trxs = await loop.run_in_executor(
+                            None,
+                            self.api._decrypt_contents,
+                            encrypted_trxs,
+                            self.senders,
+                            self.trx_types,
+                            self.lazy,
+                        )
+                    for trx in trxs:
+                        self.start_trx = trx["TrxId"]
+                        yield trx
+                        self._handled(trx["TrxId"])
+                except BaseException:
+                    _next.cancel()
+                    raise
+                self._handled_page(next_start_trx, encrypted_trxs, trxs)
+                self.start_trx = next_start_trx
+                encrypted_trxs, latency = await _next
+        finally:
+            self._commit()
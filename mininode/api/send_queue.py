@@ -0,0 +1,179 @@
+"""send_queue.py: send trxs through a bounded queue, at a limited rate"""
+import collections
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Optional, Union
+
+from mininode.crypto.account import Signer
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class TokenBucket:
+    """rate tokens are added per second, up to burst tokens"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst or max(rate, 1.0)
+        self.tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """take a token, wait until one is added if none is left"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.tokens + (now - self._updated) * self.rate, self.burst)
+                self._updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class SendQueue:
+    """a bounded queue of trxs, sent by a pool of workers at a limited rate.
+
+    every item is signed by send_trx only when a worker sends it, so it can't expire
+    while it is waiting in the queue; submit returns a Future of the response.
+    """
+
+    def __init__(
+        self,
+        api,
+        rate: Optional[float] = 10.0,
+        burst: Optional[float] = None,
+        capacity: int = 1000,
+        workers: int = 4,
+        block: bool = True,
+        timeout: Optional[float] = None,
+    ):
+        """
+        Args:
+            api (QuorumLightNodeAPI): the api to send the trxs.
+            rate (float, optional): trxs sent per second at most, no limit if None.
+            burst (float, optional): trxs sent at once after idle, defaults to rate.
+            capacity (int, optional): trxs waiting in the queue at most.
+            workers (int, optional): threads which send the trxs.
+            block (bool, optional): submit waits when the queue is full,
+                or raises queue.Full at once if False.
+            timeout (float, optional): seconds submit waits when block, then raises queue.Full.
+        """
+        self.api = api
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.capacity = capacity
+        self.block = block
+        self.timeout = timeout
+        self._queue = queue.Queue(maxsize=capacity)
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "sent": 0, "failed": 0, "rejected": 0, "in_flight": 0}
+        self._sent_times = collections.deque(maxlen=1000)
+        self._started = time.monotonic()
+        self._closed = False
+        self._workers = [
+            threading.Thread(target=self._work, name=f"mininode-send-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(
+        self,
+        private_key: Union[str, int, bytes, Signer],
+        obj: Optional[Dict] = None,
+        person: Optional[Dict] = None,
+        timestamp: Union[str, int, float, None] = None,
+    ) -> Future:
+        """queue a trx of obj/person to send by send_trx"""
+        return self.submit_call(
+            "send_trx", private_key, obj=obj, person=person, timestamp=timestamp
+        )
+
+    def submit_call(self, method: str, *args, **kwargs) -> Future:
+        """queue a call of the api method which sends one trx, such as
+        submit_call("send_content", private_key, content="hi")"""
+        if self._closed:
+            raise RuntimeError("the send queue is closed")
+        func = getattr(self.api, method)
+        future = Future()
+        try:
+            self._queue.put((future, func, args, kwargs), block=self.block, timeout=self.timeout)
+        except queue.Full:
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise
+        with self._lock:
+            self._stats["submitted"] += 1
+        return future
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                future, func, args, kwargs = item
+                if not future.set_running_or_notify_cancel():
+                    continue
+                if self.bucket:
+                    self.bucket.acquire()
+                self._send(future, func, args, kwargs)
+            finally:
+                self._queue.task_done()
+
+    def _send(self, future: Future, func, args, kwargs):
+        with self._lock:
+            self._stats["in_flight"] += 1
+        try:
+            resp = func(*args, **kwargs)
+        except Exception as err:
+            logger.warning("send queue error: %s", err)
+            self._done(failed=True)
+            future.set_exception(err)
+            return
+        # send_trx 失败时返回不含 trx_id 的响应
+        self._done(failed=not (isinstance(resp, dict) and resp.get("trx_id")))
+        future.set_result(resp)
+
+    def _done(self, failed: bool):
+        with self._lock:
+            self._stats["in_flight"] -= 1
+            self._stats["failed" if failed else "sent"] += 1
+            self._sent_times.append(time.monotonic())
+
+    def stats(self) -> Dict:
+        """submitted, sent, failed, rejected, in_flight, the depth of the queue,
+        and trx_per_sec of the last 10 seconds"""
+        now = time.monotonic()
+        with self._lock:
+            stats = dict(self._stats)
+            recent = sum(1 for i in self._sent_times if now - i <= 10)
+        window = min(10.0, now - self._started) or 1.0
+        stats.update(depth=self._queue.qsize(), trx_per_sec=recent / window)
+        return stats
+
+    def join(self):
+        """wait until every queued trx is sent"""
+        self._queue.join()
+
+    def close(self, wait: bool = True):
+        """stop accepting trxs, and stop the workers after the queued trxs are sent"""
+        self._closed = True
+        for _ in self._workers:
+            self._queue.put(_STOP)
+        if wait:
+            for worker in self._workers:
+                worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
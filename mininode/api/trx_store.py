@@ -0,0 +1,207 @@
+"""trx_store.py: an optional local store of the trxs of groups in SQLite"""
+import base64
+import json
+import logging
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from mininode.crypto.sign_trx import decrypt_obj
+from mininode.utils.trx_retweet import get_pb_trx_type
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trx (
+    trx_id TEXT PRIMARY KEY,
+    group_id TEXT NOT NULL,
+    publisher TEXT,
+    timestamp INTEGER,
+    type TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS trx_timestamp ON trx (group_id, timestamp);
+CREATE INDEX IF NOT EXISTS trx_publisher ON trx (group_id, publisher, timestamp);
+CREATE INDEX IF NOT EXISTS trx_type ON trx (group_id, type, timestamp);
+"""
+
+
+def trx_type_of(aes_key: bytes, encrypted_trx: Dict) -> str:
+    """the type of the encrypted trx, checked on the protobuf"""
+    try:
+        typeurl, obj = decrypt_obj(aes_key, base64.b64decode(encrypted_trx["Data"]))
+    except Exception:  # pylint: disable=broad-except
+        return "encrypted"
+    return get_pb_trx_type(typeurl, obj)
+
+
+class TrxStore:
+    """the encrypted trxs of groups in a SQLite file, as returned by get_trx.
+
+    trxs are kept encrypted as they are on chain, and indexed by TrxId, Publisher,
+    TimeStamp and type; set it as the store of the api to save the trxs as they are
+    synced, and to read get_trx/trx from it before requesting the fullnode.
+
+    saving a trx does not decrypt it: its type is indexed by index_types, which query and
+    count call when they filter by trx_types, so a trx is decrypted for its type only once.
+    """
+
+    def __init__(self, path: str = "mininode_trxs.db"):
+        """
+        Args:
+            path (str, optional): the SQLite file, ":memory:" to keep it in memory.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def put_many(self, group_id: str, encrypted_trxs: Iterable[Dict]) -> int:
+        """save the encrypted trxs in one transaction, return the number of trxs"""
+        rows = [
+            (
+                trx["TrxId"],
+                group_id,
+                trx.get("SenderPubkey"),
+                int(trx["TimeStamp"]) if trx.get("TimeStamp") else None,
+                json.dumps(trx),
+            )
+            for trx in encrypted_trxs
+            if isinstance(trx, dict) and trx.get("TrxId")
+        ]
+        if not rows:
+            return 0
+        with self._lock:
+            # 批量写入放在一个事务里，WAL 模式下不阻塞读
+            self._conn.execute("BEGIN")
+            try:
+                # 再次保存时保留已索引的 type
+                self._conn.executemany(
+                    "INSERT INTO trx (trx_id, group_id, publisher, timestamp, data)"
+                    " VALUES (?, ?, ?, ?, ?) ON CONFLICT (trx_id) DO UPDATE SET"
+                    " group_id = excluded.group_id, publisher = excluded.publisher,"
+                    " timestamp = excluded.timestamp, data = excluded.data",
+                    rows,
+                )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return len(rows)
+
+    def put(self, group_id: str, encrypted_trx: Dict) -> int:
+        """save an encrypted trx"""
+        return self.put_many(group_id, [encrypted_trx])
+
+    def index_types(self, group_id: str, aes_key: bytes, batch: int = 500) -> int:
+        """decrypt the saved trxs of the group whose type is not indexed yet, and index
+        their types; return the number of trxs indexed"""
+        indexed = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT trx_id, data FROM trx WHERE group_id = ? AND type IS NULL LIMIT ?",
+                    (group_id, batch),
+                ).fetchall()
+            if not rows:
+                return indexed
+            # 解密在锁外进行，不阻塞其它读写
+            types = [(trx_type_of(aes_key, json.loads(data)), trx_id) for trx_id, data in rows]
+            with self._lock:
+                self._conn.executemany("UPDATE trx SET type = ? WHERE trx_id = ?", types)
+            indexed += len(types)
+
+    def get(self, group_id: str, trx_id: str) -> Optional[Dict]:
+        """the encrypted trx, None if it is not saved"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM trx WHERE trx_id = ? AND group_id = ?", (trx_id, group_id)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    @staticmethod
+    def _where(
+        group_id: str,
+        senders: Optional[List] = None,
+        trx_types: Optional[Iterable[str]] = None,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+    ):
+        where, params = ["group_id = ?"], [group_id]
+        if senders:
+            where.append(f"publisher IN ({','.join('?' * len(senders))})")
+            params.extend(senders)
+        if trx_types:
+            trx_types = list(trx_types)
+            where.append(f"type IN ({','.join('?' * len(trx_types))})")
+            params.extend(trx_types)
+        if since is not None:
+            where.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("timestamp < ?")
+            params.append(until)
+        return " AND ".join(where), params
+
+    def query(
+        self,
+        group_id: str,
+        senders: Optional[List] = None,
+        trx_types: Optional[Iterable[str]] = None,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        num: Optional[int] = None,
+        reverse: bool = False,
+        aes_key: Optional[bytes] = None,
+    ) -> List[Dict]:
+        """the saved encrypted trxs of the group in the order of TimeStamp
+
+        Args:
+            senders (list, optional): only the trxs of the pubkeys.
+            trx_types (list, optional): only the trxs of the types of utils.get_trx_type.
+            since, until (int, optional): the range of TimeStamp in nanoseconds, [since, until).
+            num (int, optional): return num trxs at most.
+            reverse (bool, optional): the newest trx first.
+            aes_key (bytes, optional): the key of the group, to index the types of the trxs
+                not indexed yet before filtering by trx_types.
+        """
+        if trx_types and aes_key:
+            self.index_types(group_id, aes_key)
+        where, params = self._where(group_id, senders, trx_types, since, until)
+        order = "DESC" if reverse else "ASC"
+        params.append(-1 if num is None else num)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT data FROM trx WHERE {where} ORDER BY timestamp {order} LIMIT ?", params
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def count(
+        self,
+        group_id: str,
+        senders: Optional[List] = None,
+        trx_types: Optional[Iterable[str]] = None,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        aes_key: Optional[bytes] = None,
+    ) -> int:
+        """the number of the saved trxs of the group, filtered as query"""
+        if trx_types and aes_key:
+            self.index_types(group_id, aes_key)
+        where, params = self._where(group_id, senders, trx_types, since, until)
+        with self._lock:
+            row = self._conn.execute(f"SELECT COUNT(*) FROM trx WHERE {where}", params).fetchone()
+        return row[0]
+
+    def close(self):
+        """close the database"""
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,17 +1,39 @@
-""" MiniNode module"""
-
+"""MiniNode module"""
 import logging
-from urllib import parse
+from typing import Dict, List, Optional, Tuple, Union
 
 from mininode import utils
+from mininode._async_requests import AsyncHttpRequest
+from mininode._endpoints import EndpointPool
 from mininode._requests import HttpRequest
-from mininode.api import QuorumLightNodeAPI
+from mininode._retry import RetryPolicy
+from mininode.api import AsyncQuorumLightNodeAPI, QuorumLightNodeAPI, TrxStore
+from mininode.utils.ttl_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
 
+def _parse_seedurl(seedurl: str, urls: Optional[List[str]] = None) -> Dict:
+    """get the group_id, aes_key and the pool of fullnodes from seedurl"""
+    info = utils.decode_seed_url(seedurl)
+    urls = urls or info["urls"]
+    if not urls:
+        raise ValueError("Invalid seedurl.")
+    return dict(
+        group_id=info["group_id"],
+        aes_key=bytes.fromhex(info["chiperkey"]),
+        endpoints=EndpointPool.from_urls(urls),
+    )
+
+
 class MiniNode:
-    """python for quorum lightnode, without datastore, one MiniNode client for one group"""
+    """python for quorum lightnode, one MiniNode client for one group; trxs are only saved
+    locally if a TrxStore is given.
+
+    a MiniNode can be shared by threads, such as the workers of a ThreadPoolExecutor:
+    each thread sends with its own session on the shared connection pool, and the
+    nonce and timestamp of trxs are unique between threads.
+    """
 
     def __init__(
         self,
@@ -19,6 +41,12 @@ class MiniNode:
         is_session: bool = True,
         keep_alive: bool = True,
         version: int = 1,
+        urls: Optional[List[str]] = None,
+        timeout: Union[float, Tuple[float, float], None] = None,
+        pool_size: int = 20,
+        retry: Optional[RetryPolicy] = None,
+        store: Optional[TrxStore] = None,
+        cache: Union[TTLCache, bool, None] = True,
     ):
         """init mininode client
 
@@ -26,27 +54,102 @@ class MiniNode:
             seedurl (str): the seed url of rum group which shared by rum fullnode, with host:post?jwt=xxx to connect
             is_session (bool, optional): http request use session or not. Defaults to True.
             keep_alive (bool, optional): http request keep alive or not. Defaults to True.
+            urls (list, optional): fullnode urls as host:post?jwt=xxx, instead of the urls in seedurl.
+                Requests are sent to the fastest healthy one, and failover to the others.
+            timeout (float or tuple, optional): seconds to wait for a fullnode before failover,
+                as (connect, read) or one number for both. Defaults to (5, 30).
+            pool_size (int, optional): connections kept to each fullnode, as many as the threads
+                which send requests with this client. Defaults to 20.
+            retry (RetryPolicy, optional): max retries, backoff and retry budget of requests;
+                pass the same one to several clients to share its retry budget.
+            store (TrxStore, optional): the local store which saves the synced trxs,
+                and is read by get_trx/trx before requesting the fullnode. Defaults to None.
+            cache (TTLCache or bool, optional): the in-process cache of get_trx/trx, which
+                coalesces the concurrent requests of a trx; a TTLCache of 32 mb of trxs if True,
+                off if False.
 
         Raises:
             ValueError: invalid seedurl, must start with rum://seed?, shared by rum fullnode.
         """
-        info = utils.decode_seed_url(seedurl)
-        url = parse.urlparse(info["url"])
-        if not info["url"]:
-            raise ValueError("Invalid seedurl.")
-        jwt = parse.parse_qs(url.query)
-        if jwt:
-            jwt = jwt["jwt"][0]
-        else:
-            jwt = None
-
-        group_id = info["group_id"]
-        aes_key = bytes.fromhex(info["chiperkey"])
+        info = _parse_seedurl(seedurl, urls)
         _params = dict(
-            api_base=f"{url.scheme}://{url.netloc}/api/v1",
-            jwt_token=jwt,
+            endpoints=info["endpoints"],
+            timeout=timeout,
             keep_alive=keep_alive,
             is_session=is_session,
+            pool_size=pool_size,
+            retry=retry,
         )
         self.http = HttpRequest(**_params)
-        self.api = QuorumLightNodeAPI(self.http, group_id, aes_key, version=version)
+        self.api = QuorumLightNodeAPI(
+            self.http, info["group_id"], info["aes_key"], version=version, store=store, cache=cache
+        )
+
+    def close(self):
+        """close the http connection pool"""
+        self.http.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AsyncMiniNode:
+    """asyncio version of MiniNode, one AsyncMiniNode client for one group"""
+
+    def __init__(
+        self,
+        seedurl: str,
+        keep_alive: bool = True,
+        version: int = 1,
+        pool_size: int = 100,
+        urls: Optional[List[str]] = None,
+        timeout: Union[float, Tuple[float, float], None] = None,
+        retry: Optional[RetryPolicy] = None,
+        store: Optional[TrxStore] = None,
+        cache: Union[TTLCache, bool, None] = True,
+    ):
+        """init asyncio mininode client
+
+        Args:
+            seedurl (str): the seed url of rum group which shared by rum fullnode, with host:post?jwt=xxx to connect
+            keep_alive (bool, optional): http request keep alive or not. Defaults to True.
+            pool_size (int, optional): max connections to the fullnode in flight. Defaults to 100.
+            urls (list, optional): fullnode urls as host:post?jwt=xxx, instead of the urls in seedurl.
+                Requests are sent to the fastest healthy one, and failover to the others.
+            timeout (float or tuple, optional): seconds to wait for a fullnode before failover,
+                as (connect, read) or one number for both. Defaults to (5, 30).
+            retry (RetryPolicy, optional): max retries, backoff and retry budget of requests.
+            store (TrxStore, optional): the local store which saves the synced trxs,
+                and is read by get_trx/trx before requesting the fullnode. Defaults to None.
+            cache (TTLCache or bool, optional): the in-process cache of get_trx/trx, which
+                coalesces the concurrent requests of a trx; a TTLCache of 32 mb of trxs if True,
+                off if False.
+
+        Raises:
+            ValueError: invalid seedurl, must start with rum://seed?, shared by rum fullnode.
+        """
+        info = _parse_seedurl(seedurl, urls)
+        _params = dict(
+            endpoints=info["endpoints"],
+            timeout=timeout,
+            keep_alive=keep_alive,
+            pool_size=pool_size,
+            retry=retry,
+        )
+        self.http = AsyncHttpRequest(**_params)
+        self.api = AsyncQuorumLightNodeAPI(
+            self.http, info["group_id"], info["aes_key"], version=version, store=store, cache=cache
+        )
+
+    async def close(self):
+        """close the http connection pool"""
+        await self.http.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
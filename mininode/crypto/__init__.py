@@ -1,12 +1,19 @@
 """crypto"""
 from mininode.crypto.account import *
+from mininode.crypto.backends import get_backend, set_backend
+from mininode.crypto.lazy_trx import LazyTrx
 from mininode.crypto.sign_trx import trx_decrypt, trx_encrypt
 
 __all__ = [
+    "Signer",
+    "get_signer",
     "create_private_key",
     "private_key_to_keystore",
     "keystore_to_private_key",
     "private_key_to_pubkey",
     "private_key_to_address",
     "public_key_to_address",
+    "LazyTrx",
+    "get_backend",
+    "set_backend",
 ]
@@ -7,6 +7,8 @@ import eth_keys
 from eth_account import Account
 from eth_utils.hexadecimal import encode_hex
 
+from mininode.crypto.backends import get_ecc_backend
+
 logger = logging.getLogger(__name__)
 
 
@@ -17,8 +19,44 @@ def create_private_key() -> str:
     return private_key
 
 
-def check_private_key(private_key: Union[str, int, bytes]) -> bytes:
+class Signer:
+    """the account of a private key, which derives the key material once and reuses it
+
+    pass it instead of the raw private key to the send methods of QuorumLightNodeAPI.
+    """
+
+    __slots__ = ("private_key", "pvtkey", "pubkey", "address")
+
+    def __init__(self, private_key: Union[str, int, bytes]):
+        self.private_key = check_private_key(private_key)
+        self.pvtkey = eth_keys.keys.PrivateKey(self.private_key, backend=get_ecc_backend())
+        self.pubkey = base64.urlsafe_b64encode(
+            self.pvtkey.public_key.to_compressed_bytes()
+        ).decode()
+        self.address = self.pvtkey.public_key.to_checksum_address()
+
+    def __repr__(self):
+        return f"Signer(pubkey={self.pubkey!r})"
+
+    def __reduce__(self):
+        return (Signer, (self.private_key,))
+
+    def sign_msg_hash(self, msg_hash: bytes) -> bytes:
+        """sign the hash and return the signature bytes"""
+        return self.pvtkey.sign_msg_hash(msg_hash).to_bytes()
+
+
+def get_signer(private_key: Union[str, int, bytes, Signer]) -> Signer:
+    """get the Signer of private key, the Signer itself is returned as it is"""
+    if isinstance(private_key, Signer):
+        return private_key
+    return Signer(private_key)
+
+
+def check_private_key(private_key: Union[str, int, bytes, Signer]) -> bytes:
     """check private key"""
+    if isinstance(private_key, Signer):
+        return private_key.private_key
     if isinstance(private_key, int):
         private_key = hex(private_key)
     if isinstance(private_key, str):
@@ -35,8 +73,10 @@ def check_private_key(private_key: Union[str, int, bytes]) -> bytes:
     return private_key
 
 
-def private_key_to_address(private_key: Union[str, int, bytes]) -> str:
+def private_key_to_address(private_key: Union[str, int, bytes, Signer]) -> str:
     """private key to address"""
+    if isinstance(private_key, Signer):
+        return private_key.address
     private_key = check_private_key(private_key)
     address = Account().from_key(private_key).address
     return address
@@ -50,15 +90,17 @@ def public_key_to_address(public_key: str) -> str:
     return address
 
 
-def private_key_to_pubkey(private_key: Union[str, int, bytes]) -> str:
+def private_key_to_pubkey(private_key: Union[str, int, bytes, Signer]) -> str:
     """private key to public key"""
+    if isinstance(private_key, Signer):
+        return private_key.pubkey
     private_key = check_private_key(private_key)
-    account = eth_keys.keys.PrivateKey(private_key)
+    account = eth_keys.keys.PrivateKey(private_key, backend=get_ecc_backend())
     public_key = base64.urlsafe_b64encode(account.public_key.to_compressed_bytes()).decode()
     return public_key
 
 
-def private_key_to_keystore(private_key: Union[str, int, bytes], password: str):
+def private_key_to_keystore(private_key: Union[str, int, bytes, Signer], password: str):
     """private key to keystore with password"""
     private_key = check_private_key(private_key)
     keystore = Account().from_key(private_key).encrypt(password=password)
@@ -0,0 +1,137 @@
+"""backends.py: the implementations of AES-GCM and secp256k1 used by mininode
+
+aes backends: "cryptography" (AESGCM, with the key context reused) or "pycryptodome".
+ecc backends: "coincurve" (libsecp256k1) or "eth_keys" (pure python).
+The fast one installed is selected automatically, which can be overridden by
+set_backend() or the env MININODE_AES_BACKEND / MININODE_ECC_BACKEND.
+"""
+
+import functools
+import logging
+import os
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+AES_BACKENDS = ("cryptography", "pycryptodome")
+ECC_BACKENDS = ("coincurve", "eth_keys")
+
+
+class PyCryptodomeAES:
+    """AES-GCM by pycryptodome, a new cipher for every message"""
+
+    name = "pycryptodome"
+
+    def __init__(self):
+        from Crypto.Cipher import AES  # pylint: disable=import-outside-toplevel
+
+        self._aes = AES
+
+    def encrypt(self, key: bytes, data: bytes) -> bytes:
+        """aes encrypt"""
+        cipher = self._aes.new(key, self._aes.MODE_GCM, nonce=os.urandom(12))
+        ciphertext, tag = cipher.encrypt_and_digest(data)
+        return b"".join([cipher.nonce, ciphertext, tag])
+
+    def decrypt(self, key: bytes, data: bytes) -> bytes:
+        """aes decrypt"""
+        nonce, tag = data[:12], data[-16:]
+        cipher = self._aes.new(key, self._aes.MODE_GCM, nonce=nonce)
+        return cipher.decrypt_and_verify(data[12:-16], tag)
+
+
+class CryptographyAES:
+    """AES-GCM by cryptography, the key context is cached and reused between messages"""
+
+    name = "cryptography"
+
+    def __init__(self):
+        # pylint: disable=import-outside-toplevel
+        from cryptography.exceptions import InvalidTag
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+        self._invalid_tag = InvalidTag
+        self._context = functools.lru_cache(maxsize=64)(AESGCM)
+
+    def encrypt(self, key: bytes, data: bytes) -> bytes:
+        """aes encrypt, the tag is appended to the ciphertext as pycryptodome does"""
+        nonce = os.urandom(12)
+        return nonce + self._context(key).encrypt(nonce, data, None)
+
+    def decrypt(self, key: bytes, data: bytes) -> bytes:
+        """aes decrypt"""
+        try:
+            return self._context(key).decrypt(data[:12], data[12:], None)
+        except self._invalid_tag as err:
+            raise ValueError("MAC check failed") from err
+
+
+def _init_aes(name: str):
+    if name == "cryptography":
+        return CryptographyAES()
+    if name == "pycryptodome":
+        return PyCryptodomeAES()
+    raise ValueError(f"Invalid aes backend: {name}, should be one of {AES_BACKENDS}")
+
+
+def _init_ecc(name: str):
+    # pylint: disable=import-outside-toplevel
+    if name == "coincurve":
+        from eth_keys.backends import CoinCurveECCBackend
+
+        return CoinCurveECCBackend()
+    if name == "eth_keys":
+        from eth_keys.backends import NativeECCBackend
+
+        return NativeECCBackend()
+    raise ValueError(f"Invalid ecc backend: {name}, should be one of {ECC_BACKENDS}")
+
+
+def _auto(init, names):
+    """init the first backend which is installed"""
+    for name in names:
+        try:
+            return name, init(name)
+        except ImportError:
+            logger.info("crypto backend %s is not installed", name)
+    raise ImportError(f"none of the crypto backends {names} is installed")
+
+
+_backends = {}
+
+
+def set_backend(aes: Optional[str] = None, ecc: Optional[str] = None):
+    """select the aes and/or ecc backend by name, or None to keep the current one
+
+    Signer created before should be created again to use the new ecc backend.
+    """
+    if aes is not None:
+        _backends["aes"] = (aes, _init_aes(aes))
+    if ecc is not None:
+        _backends["ecc"] = (ecc, _init_ecc(ecc))
+
+
+def get_backend() -> Dict[str, str]:
+    """the names of the active backends, such as {"aes": "cryptography", "ecc": "coincurve"}"""
+    return {"aes": _get("aes")[0], "ecc": _get("ecc")[0]}
+
+
+def _get(kind: str):
+    if kind not in _backends:
+        if kind == "aes":
+            env = os.getenv("MININODE_AES_BACKEND")
+            _backends[kind] = (env, _init_aes(env)) if env else _auto(_init_aes, AES_BACKENDS)
+        else:
+            env = os.getenv("MININODE_ECC_BACKEND")
+            _backends[kind] = (env, _init_ecc(env)) if env else _auto(_init_ecc, ECC_BACKENDS)
+    return _backends[kind]
+
+
+def get_aes_backend():
+    """the active aes backend, with encrypt(key, data) and decrypt(key, data)"""
+    return _get("aes")[1]
+
+
+def get_ecc_backend():
+    """the active ecc backend, as the backend of eth_keys.keys.PrivateKey"""
+    return _get("ecc")[1]
@@ -0,0 +1,100 @@
+"""lazy_trx.py"""
+import base64
+import logging
+from collections.abc import Mapping
+from typing import Dict, List
+
+from google.protobuf import json_format
+
+from mininode.crypto.sign_trx import decrypt_obj
+from mininode.utils.trx_retweet import get_pb_trx_type
+
+logger = logging.getLogger(__name__)
+
+_UNDECRYPTED = object()
+
+
+class LazyTrx(Mapping):
+    """a trx of group content, decrypted only when its TypeUrl or Content is accessed.
+
+    it holds the encrypted bytes and TrxId/Publisher/TimeStamp, and can be used as
+    the dict returned by trx_decrypt, such as trx["Content"], trx.get("TypeUrl").
+    """
+
+    __slots__ = ("TrxId", "Publisher", "TimeStamp", "_aes_key", "_data", "_typeurl", "_obj")
+
+    _keys = ("TrxId", "Publisher", "Content", "TypeUrl", "TimeStamp")
+
+    def __init__(self, aes_key: bytes, encrypted_trx: Dict):
+        self.TrxId = encrypted_trx.get("TrxId")
+        self.Publisher = encrypted_trx.get("SenderPubkey")
+        self.TimeStamp = encrypted_trx.get("TimeStamp")
+        self._aes_key = aes_key
+        data = encrypted_trx.get("Data")
+        self._data = base64.b64decode(data) if data else None
+        self._typeurl = None
+        self._obj = _UNDECRYPTED
+
+    def __repr__(self):
+        return f"LazyTrx(TrxId={self.TrxId!r}, Publisher={self.Publisher!r})"
+
+    def _decrypt(self):
+        """decrypt once, and release the encrypted bytes"""
+        if self._obj is not _UNDECRYPTED:
+            return
+        try:
+            if self._data is None:
+                raise ValueError("Data is None")
+            self._typeurl, self._obj = decrypt_obj(self._aes_key, self._data)
+            self._data = None
+        except Exception as err:
+            logger.info("trx decrypt error: %s", err)
+            self._typeurl, self._obj = "encrypted", None
+
+    @property
+    def obj(self):
+        """the decrypted pbQuorum.Object or pbQuorum.Person, None if it can't be decrypted"""
+        self._decrypt()
+        return self._obj
+
+    @property
+    def TypeUrl(self) -> str:  # pylint: disable=invalid-name
+        """quorum.pb.Object, quorum.pb.Person, or encrypted if it can't be decrypted"""
+        self._decrypt()
+        return self._typeurl
+
+    def __getitem__(self, key):
+        if key == "Content":
+            # 每次访问时由 protobuf 转换为 dict，不缓存大体积的 dict
+            if self.obj is None:
+                raise KeyError(key)
+            return json_format.MessageToDict(self._obj)
+        if key not in self._keys:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        for key in self._keys:
+            if key != "Content" or self.obj is not None:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def trx_type(self, deep_to_reply=False) -> str:
+        """get type of trx from the decrypted protobuf, without converting it to dict"""
+        return get_pb_trx_type(self.TypeUrl, self.obj, deep_to_reply)
+
+    def images(self) -> List[Dict]:
+        """the images of the trx with raw bytes as content, without the base64 round trip"""
+        if self.obj is None:
+            return []
+        if self._typeurl == "quorum.pb.Person":
+            imgs = [self._obj.image] if self._obj.HasField("image") else []
+        else:
+            imgs = self._obj.image
+        return [{"name": i.name, "mediaType": i.mediaType, "content": i.content} for i in imgs]
+
+    def to_dict(self) -> Dict:
+        """the trx as the dict returned by trx_decrypt"""
+        return dict(self)
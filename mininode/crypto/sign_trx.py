@@ -1,42 +1,59 @@
 """sign_trx.py"""
 import base64
 import hashlib
+import itertools
 import json
 import logging
 import os
+import threading
 import time
 import uuid
-from typing import Any, Dict, Union
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
 
-import eth_keys
-from Crypto.Cipher import AES
 from google.protobuf import any_pb2, json_format
 
-from mininode.crypto.account import private_key_to_pubkey
+from mininode.crypto.account import Signer, get_signer
+from mininode.crypto.backends import get_aes_backend
 from mininode.proto import pbQuorum
+from mininode.utils.trx_retweet import get_pb_trx_type
 
 logger = logging.getLogger(__name__)
-nonce = 1
+
+# 线程安全的 nonce 与纳秒时间戳，供多线程并发签名
+_nonces = itertools.count(2)
+_timestamp_lock = threading.Lock()
+_last_timestamp = 0
+
+
+def next_nonce() -> int:
+    """the nonce of the next trx, increasing and unique in the process;
+    next() of itertools.count is atomic, so no lock is needed"""
+    return next(_nonces)
+
+
+def unique_timestamp() -> int:
+    """the current time in nanoseconds, strictly increasing between the calls of all threads"""
+    global _last_timestamp  # pylint: disable=global-statement
+    with _timestamp_lock:
+        _last_timestamp = max(time.time_ns(), _last_timestamp + 1)
+        return _last_timestamp
 
 
 def aes_encrypt(key: bytes, data: bytes) -> bytes:
     """aes encrypt"""
-    cipher = AES.new(key, AES.MODE_GCM, nonce=os.urandom(12))
-    ciphertext, tag = cipher.encrypt_and_digest(data)
-    return b"".join([cipher.nonce, ciphertext, tag])
+    return get_aes_backend().encrypt(key, data)
 
 
 def aes_decrypt(key: bytes, data: bytes) -> bytes:
     """aes decrypt"""
-    nonce, tag = data[:12], data[-16:]
-    cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
-    return cipher.decrypt_and_verify(data[12:-16], tag)
+    return get_aes_backend().decrypt(key, data)
 
 
 def check_timestamp(timestamp: Union[str, int, float, None] = None):
     """check timestamp"""
     if timestamp is None:
-        return int(time.time() * 1e9)
+        return unique_timestamp()
     try:
         timestamp = str(timestamp).replace(".", "")
         if len(timestamp) > 19:
@@ -47,57 +64,86 @@ def check_timestamp(timestamp: Union[str, int, float, None] = None):
         return timestamp
     except Exception as err:
         logger.info("timestamp error: %s", err)
-        return int(time.time() * 1e9)
+        return unique_timestamp()
+
+
+def pack_obj(obj: Dict[str, Any] = None, person: Dict[str, Any] = None) -> bytes:
+    """the obj or person packed as protobuf Any, the unencrypted data of trx"""
+    if obj is None and person is None:
+        raise ValueError("obj and person is None")
+    if obj is not None and person is not None:
+        raise ValueError("obj and person is not None")
+    if obj is not None:
+        obj_pb = pbQuorum.Object(**obj)
+    elif person is not None:
+        obj_pb = pbQuorum.Person(**person)
+    any_obj_pb = any_pb2.Any()
+    any_obj_pb.Pack(obj_pb, type_url_prefix="type.googleapis.com/")
+    return any_obj_pb.SerializeToString()
 
 
 def trx_encrypt(
     group_id: str,
     aes_key: bytes,
-    private_key: bytes,
+    private_key: Union[bytes, Signer],
     obj: Dict[str, Any] = None,
     person: Dict[str, Any] = None,
     timestamp=None,
     version: int = 1,
+    trx_id: Optional[str] = None,
 ) -> Dict[str, str]:
-    """trx encrypt"""
+    """trx encrypt
+
+    trx_id: sign the trx with the given TrxId instead of a new uuid, such as to
+        sign a trx again after it expired, and it is still the same trx to the fullnode.
+    """
+    return data_encrypt(
+        group_id,
+        aes_key,
+        private_key,
+        pack_obj(obj, person),
+        timestamp=timestamp,
+        version=version,
+        trx_id=trx_id,
+    )
+
+
+def data_encrypt(
+    group_id: str,
+    aes_key: bytes,
+    private_key: Union[bytes, Signer],
+    data: bytes,
+    timestamp=None,
+    version: int = 1,
+    trx_id: Optional[str] = None,
+) -> Dict[str, str]:
+    """sign and encrypt the data packed by pack_obj as the payload of send_trx"""
     # pylint: disable=W,E,R
 
     if str(version) not in ["1", "2"]:
         raise Exception("trx version error, only support 1 or 2")
 
-    if obj is None and person is None:
-        raise ValueError("obj and person is None")
-    if obj is not None and person is not None:
-        raise ValueError("obj and person is not None")
-    if obj is not None:
-        obj_pb = pbQuorum.Object(**obj)
-    elif person is not None:
-        obj_pb = pbQuorum.Person(**person)
-    any_obj_pb = any_pb2.Any()
-    any_obj_pb.Pack(obj_pb, type_url_prefix="type.googleapis.com/")
-    data = any_obj_pb.SerializeToString()
     encrypted = aes_encrypt(aes_key, data)
 
-    pvtkey = eth_keys.keys.PrivateKey(private_key)
-    sender_pub_key = private_key_to_pubkey(private_key)
+    signer = get_signer(private_key)
+    sender_pub_key = signer.pubkey
 
     timestamp = check_timestamp(timestamp)
-    global nonce
     trx = {
-        "TrxId": str(uuid.uuid4()),
+        "TrxId": trx_id or str(uuid.uuid4()),
         "GroupId": group_id,
         "Data": encrypted,
         "TimeStamp": timestamp,
         "Version": f"{version}.0.0",
         "Expired": timestamp + int(30 * 1e9),
-        "Nonce": nonce + 1,
+        "Nonce": next_nonce(),
         "SenderPubkey": sender_pub_key,
     }
 
     trx_without_sign_pb = pbQuorum.Trx(**trx)
     trx_without_sign_pb_bytes = trx_without_sign_pb.SerializeToString()
     trx_hash = hashlib.sha256(trx_without_sign_pb_bytes).digest()
-    signature = pvtkey.sign_msg_hash(trx_hash).to_bytes()
+    signature = signer.sign_msg_hash(trx_hash)
     trx["SenderSign"] = signature
 
     trx_pb = pbQuorum.Trx(**trx)
@@ -116,13 +162,44 @@ def trx_encrypt(
     return send_trx_obj
 
 
-def trx_decrypt(aes_key: bytes, encrypted_trx: Dict):
-    """trx decrypt"""
-    # pylint: disable=W,E,R
-    data = encrypted_trx.get("Data")
-    if data is None:
-        raise ValueError("Data is None")
-    data = base64.b64decode(data)
+def _trx_encrypt_item(args) -> Union[Dict[str, str], Exception]:
+    """trx encrypt in the worker process, return the error instead of raising it"""
+    group_id, aes_key, item, version = args
+    try:
+        return trx_encrypt(group_id, aes_key, version=version, **item)
+    except Exception as err:
+        return err
+
+
+def trx_encrypt_many(
+    group_id: str,
+    aes_key: bytes,
+    items: List[Dict[str, Any]],
+    version: int = 1,
+    max_workers: Optional[int] = None,
+    executor: Optional[Executor] = None,
+) -> List[Union[Dict[str, str], Exception]]:
+    """trx encrypt many items across a process pool
+
+    items: list of dict with keys of trx_encrypt: private_key, obj/person, timestamp
+    executor: reuse a pool between batches, or a new ProcessPoolExecutor is created
+
+    returns the encrypted trxs in the order of items; the error of an item is returned
+    in its place, and does not abort the others.
+    """
+    args = [(group_id, aes_key, item, version) for item in items]
+    if not args:
+        return []
+    if executor is not None:
+        return list(executor.map(_trx_encrypt_item, args))
+    max_workers = max_workers or os.cpu_count() or 1
+    chunksize = max(1, len(args) // (max_workers * 4))
+    with ProcessPoolExecutor(max_workers=max_workers) as _executor:
+        return list(_executor.map(_trx_encrypt_item, args, chunksize=chunksize))
+
+
+def decrypt_obj(aes_key: bytes, data: bytes) -> Tuple[str, Any]:
+    """decrypt the Data bytes of trx to its typeurl and pbQuorum.Person or pbQuorum.Object"""
     data = aes_decrypt(aes_key, data)
     any_obj = any_pb2.Any().FromString(data)
     if any_obj.type_url.find("quorum.pb.Person") >= 0:
@@ -134,6 +211,22 @@ def trx_decrypt(aes_key: bytes, encrypted_trx: Dict):
     else:
         raise ValueError("type_url is not quorum.pb.Person or quorum.pb.Object")
     any_obj.Unpack(obj)
+    return typeurl, obj
+
+
+def trx_decrypt(aes_key: bytes, encrypted_trx: Dict, trx_types: Optional[Tuple] = None):
+    """trx decrypt
+
+    trx_types: return None, without the MessageToDict conversion,
+        if the trx is not one of trx_types, which is checked on the protobuf.
+    """
+    # pylint: disable=W,E,R
+    data = encrypted_trx.get("Data")
+    if data is None:
+        raise ValueError("Data is None")
+    typeurl, obj = decrypt_obj(aes_key, base64.b64decode(data))
+    if trx_types and get_pb_trx_type(typeurl, obj) not in trx_types:
+        return None
     dict_obj = json_format.MessageToDict(obj)
     decrpyted_trx = {
         "TrxId": encrypted_trx.get("TrxId"),
@@ -143,3 +236,50 @@ def trx_decrypt(aes_key: bytes, encrypted_trx: Dict):
         "TimeStamp": encrypted_trx.get("TimeStamp"),
     }
     return decrpyted_trx
+
+
+def try_trx_decrypt(
+    aes_key: bytes, encrypted_trx: Dict, trx_types: Optional[Tuple] = None
+) -> Optional[Dict]:
+    """trx decrypt, or mark the trx as encrypted if it can't be decrypted;
+    None if the trx is not one of trx_types"""
+    try:
+        return trx_decrypt(aes_key, encrypted_trx, trx_types)
+    except Exception as err:
+        logger.info("trx decrypt error: %s", err)
+        if trx_types and "encrypted" not in trx_types:
+            return None
+        return {
+            "TrxId": encrypted_trx.get("TrxId"),
+            "Publisher": encrypted_trx.get("SenderPubkey"),
+            "TypeUrl": "encrypted",
+            "TimeStamp": encrypted_trx.get("TimeStamp"),
+            "Data": encrypted_trx.get("Data"),
+        }
+
+
+def _trx_decrypt_chunk(args) -> List[Dict]:
+    aes_key, encrypted_trxs, trx_types = args
+    trxs = [try_trx_decrypt(aes_key, i, trx_types) for i in encrypted_trxs]
+    return [i for i in trxs if i is not None]
+
+
+def trx_decrypt_many(
+    aes_key: bytes,
+    encrypted_trxs: List[Dict],
+    executor: Optional[Executor] = None,
+    trx_types: Optional[Tuple] = None,
+) -> List[Dict]:
+    """trx decrypt many in order, split into chunks across the workers of executor if given.
+
+    a trx which can't be decrypted is marked as encrypted, and the others go on.
+    trx_types: only the trxs of trx_types are returned, checked before MessageToDict.
+    """
+    if executor is None or len(encrypted_trxs) < 2:
+        return _trx_decrypt_chunk((aes_key, encrypted_trxs, trx_types))
+    size = -(-len(encrypted_trxs) // (os.cpu_count() or 1))
+    chunks = [encrypted_trxs[i : i + size] for i in range(0, len(encrypted_trxs), size)]
+    trxs = []
+    for chunk in executor.map(_trx_decrypt_chunk, [(aes_key, i, trx_types) for i in chunks]):
+        trxs.extend(chunk)
+    return trxs
@@ -1,9 +1,19 @@
 """utils"""
-from mininode.utils.image import get_filebytes, pack_images, pack_profile_image, zip_image
+from mininode.utils.image import (
+    ImagePacker,
+    compress_image,
+    get_filebytes,
+    pack_images,
+    pack_profile_image,
+    zip_image,
+)
+from mininode.utils.image_cache import ImageCache, get_image_cache, set_image_cache
 from mininode.utils.trx_retweet import (
     CLIENT_TRX_TYPES,
+    get_pb_trx_type,
     get_trx_type,
     init_trx_retweet_params,
     timestamp_to_datetime,
 )
+from mininode.utils.ttl_cache import TTLCache
 from mininode.utils.url import decode_seed_url, join_url
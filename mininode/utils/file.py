@@ -0,0 +1,161 @@
+"""file: split a file into trxs of CHUNK_SIZE, and join the trxs back into the file"""
+import base64
+import contextlib
+import hashlib
+import json
+import os
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple, Union
+
+import filetype
+
+from mininode.utils.image import CHUNK_SIZE
+
+FILEINFO_NAME = "fileinfo"
+SEGMENT_PREFIX = "seg-"
+
+
+def read_chunks(
+    path_or_file: Union[str, BinaryIO], chunk_size: int = CHUNK_SIZE
+) -> Iterator[bytes]:
+    """read the file chunk by chunk, without loading the whole file"""
+    if isinstance(path_or_file, str):
+        if not os.path.isfile(path_or_file):
+            raise ValueError(f"{path_or_file} is not a file.")
+        with open(path_or_file, "rb") as read_f:
+            yield from iter(lambda: read_f.read(chunk_size), b"")
+    else:
+        yield from iter(lambda: path_or_file.read(chunk_size), b"")
+
+
+def file_name(path_or_file: Union[str, BinaryIO], name: Optional[str] = None) -> str:
+    """the name of the file to upload"""
+    if name:
+        return name
+    _name = path_or_file if isinstance(path_or_file, str) else getattr(path_or_file, "name", "")
+    return os.path.basename(_name) if isinstance(_name, str) and _name else "file"
+
+
+def segment_obj(index: int, chunk: bytes) -> Dict:
+    """the obj of the trx which carries the index-th chunk, starts from 1"""
+    return {
+        "type": "File",
+        "name": f"{SEGMENT_PREFIX}{index}",
+        "file": {
+            "compression": 0,
+            "mediaType": "application/octet-stream",
+            "content": chunk,
+        },
+    }
+
+
+def iter_segments(
+    path_or_file: Union[str, BinaryIO], fileinfo: Dict, chunk_size: int = CHUNK_SIZE
+) -> Iterator[Tuple[int, bytes]]:
+    """yield (index, chunk) of the file, and fill the size, mediaType and sha256 of fileinfo"""
+    digest = hashlib.sha256()
+    fileinfo.update(size=0, mediaType="application/octet-stream")
+    for index, chunk in enumerate(read_chunks(path_or_file, chunk_size), start=1):
+        if index == 1:
+            fileinfo["mediaType"] = guess_media_type(chunk)
+        digest.update(chunk)
+        fileinfo["size"] += len(chunk)
+        yield index, chunk
+    fileinfo["sha256"] = digest.hexdigest()
+
+
+def segment_info(index: int, chunk: bytes, trx_id: str) -> Dict:
+    """the item of the segment in fileinfo"""
+    return {
+        "id": f"{SEGMENT_PREFIX}{index}",
+        "trx_id": trx_id,
+        "size": len(chunk),
+        "sha256": hashlib.sha256(chunk).hexdigest(),
+    }
+
+
+def guess_media_type(chunk: bytes) -> str:
+    """the media type of the file by its first chunk"""
+    kind = filetype.guess(chunk)
+    return kind.mime if kind else "application/octet-stream"
+
+
+def fileinfo_obj(fileinfo: Dict) -> Dict:
+    """the obj of the trx which carries the fileinfo as json"""
+    return {
+        "type": "File",
+        "name": FILEINFO_NAME,
+        "file": {
+            "compression": 0,
+            "mediaType": "application/json",
+            "content": json.dumps(fileinfo).encode(),
+        },
+    }
+
+
+def _file_of_trx(trx: Dict) -> Tuple[str, bytes]:
+    """the name and content bytes of the file trx decrypted by trx_decrypt"""
+    content = (trx or {}).get("Content") or {}
+    if content.get("type") != "File" or "file" not in content:
+        raise ValueError(f"trx {trx.get('TrxId') if trx else trx} is not a file trx")
+    return content.get("name"), base64.b64decode(content["file"].get("content", ""))
+
+
+def parse_fileinfo(trx: Dict) -> Dict:
+    """the fileinfo of the fileinfo trx"""
+    name, data = _file_of_trx(trx)
+    if name != FILEINFO_NAME:
+        raise ValueError(f"trx {trx.get('TrxId')} is not a fileinfo trx, but {name}")
+    fileinfo = json.loads(data)
+    fileinfo["trx_id"] = trx.get("TrxId")
+    return fileinfo
+
+
+def segment_bytes(trx: Dict, segment: Dict) -> bytes:
+    """the chunk of the segment trx, checked by the sha256 of fileinfo"""
+    name, data = _file_of_trx(trx)
+    if name != segment["id"]:
+        raise ValueError(f"trx {trx.get('TrxId')} is {name}, not {segment['id']}")
+    if hashlib.sha256(data).hexdigest() != segment["sha256"]:
+        raise ValueError(f"sha256 of {segment['id']} mismatched")
+    return data
+
+
+def segment_offsets(fileinfo: Dict) -> Iterator[Tuple[int, Dict]]:
+    """the offset in the file of each segment"""
+    offset = 0
+    for segment in fileinfo["segments"]:
+        yield offset, segment
+        offset += segment["size"]
+
+
+def download_path(fileinfo: Dict, file_dir: str, file_path: Optional[str] = None) -> str:
+    """the path to save the file, under file_dir with its name if file_path is not given"""
+    if file_path:
+        return file_path
+    return os.path.join(file_dir, os.path.basename(fileinfo.get("name") or fileinfo["trx_id"]))
+
+
+@contextlib.contextmanager
+def open_download(path: str, fileinfo: Dict):
+    """open a .part file of the size of the file, to write the segments at their offsets;
+    on exit it is checked by sha256 and moved to path, or removed if anything fails"""
+    tmp = f"{path}.part"
+    try:
+        with open(tmp, "wb") as write_f:
+            write_f.truncate(fileinfo["size"])
+            yield write_f
+        check_file_sha256(tmp, fileinfo["sha256"])
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    os.replace(tmp, path)
+
+
+def check_file_sha256(path: str, sha256: str):
+    """check the whole file, read in chunks"""
+    digest = hashlib.sha256()
+    for chunk in read_chunks(path, 1024 * 1024):
+        digest.update(chunk)
+    if digest.hexdigest() != sha256:
+        raise ValueError(f"sha256 of {path} mismatched")
@@ -3,14 +3,20 @@ import base64
 import datetime
 import io
 import logging
+import math
 import os
 import re
+import shutil
+import subprocess
+import threading
 import uuid
-from typing import Dict, List, Union
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
 
 import filetype
-from PIL import Image
-from pygifsicle import gifsicle
+from PIL import Image, ImageSequence
+
+from mininode.utils.image_cache import get_image_cache
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +26,7 @@ IMAGE_MAX_SIZE_KB = 200  # 200 kb 每条trx中所包含的图片总大小限制
 # 单条 trx 最多4 张图片；此为 rum app 客户端限定：第三方 app 调整该限定
 IMAGE_MAX_NUM = 4
 CHUNK_SIZE = 150 * 1024  # 150 kb，文件切割为多条trxs时，每条trx所包含的文件字节流上限
+GIFSICLE = "gifsicle"  # gifsicle 可执行文件，未安装时使用 Pillow 压缩动图
 
 
 def _read_file_to_bytes(file_path: str) -> bytes:
@@ -50,98 +57,369 @@ def get_filebytes(path_bytes_string) -> bytes:
     return file_bytes, is_file
 
 
-def _zip_gif(gif: str, max_size: int = IMAGE_MAX_SIZE_KB, is_cover: bool = False):
-    """压缩动图(gif)到指定大小(kb)以下
+def _gifsicle_scale(gif_bytes: bytes, scale: float) -> bytes:
+    """scale the gif by gifsicle through stdin/stdout, no file is written"""
+    args = [GIFSICLE, "-O3", "--lossy=80", "--no-warnings"]
+    if scale < 1:
+        args += ["--scale", f"{scale:.4f}"]
+    return subprocess.run(args, input=gif_bytes, stdout=subprocess.PIPE, check=True).stdout
+
+
+def _pillow_gif_scale(gif_bytes: bytes, scale: float) -> bytes:
+    """scale every frame of the gif by Pillow, when gifsicle is not installed"""
+    with io.BytesIO(gif_bytes) as io_gif:
+        img = Image.open(io_gif)
+        x_size, y_size = img.size
+        size = (max(1, int(x_size * scale)), max(1, int(y_size * scale)))
+        frames, durations = [], []
+        for frame in ImageSequence.Iterator(img):
+            durations.append(frame.info.get("duration", 100))
+            frames.append(frame.convert("RGBA").resize(size, Image.LANCZOS))
+        loop = img.info.get("loop", 0)
+    with io.BytesIO() as io_out:
+        frames[0].save(
+            io_out,
+            "gif",
+            save_all=True,
+            append_images=frames[1:],
+            duration=durations,
+            loop=loop,
+            optimize=True,
+            disposal=2,
+        )
+        return io_out.getvalue()
+
+
+def _zip_gif(
+    gif_bytes: bytes,
+    max_size: int = IMAGE_MAX_SIZE_KB,
+    max_passes: int = 8,
+    tolerance: float = 0.15,
+) -> bytes:
+    """压缩动图(gif)字节到指定大小(kb)以下, 全程在内存中进行, 不写文件
 
-    gif: gif 格式动图本地路径
+    gif_bytes: gif 格式动图字节
     max_size: 指定压缩大小, 默认 200kb
-    is_cover: 是否覆盖原图, 默认不覆盖
+    max_passes: 找到合适大小后最多缩放的次数
+    tolerance: 结果不小于 max_size 的 (1 - tolerance) 时停止搜索
 
-    返回压缩后图片字节. 该方法需要安装 gifsicle 软件和 pygifsicle 模块
+    先按 字节数 ~ scale**2 估算缩放比例; 一旦同时有未超出与超出大小的比例,
+    在两者之间按 scale**2 插值收窄, 直至大小接近 max_size 或达到 max_passes;
+    安装了 gifsicle 软件时通过管道调用, 否则使用 Pillow 逐帧缩放.
     """
-
     max_size = max_size or IMAGE_MAX_SIZE_KB
-    size = os.path.getsize(gif) / 1024
-    if size < max_size:
-        return _read_file_to_bytes(gif)
-
-    destination = None
-    if not is_cover:
-        destination = f"{os.path.splitext(gif)[0]}-zip.gif"
-
-    percent = 0.9
-    while size >= max_size:
-        gifsicle(
-            gif,
-            destination=destination,
-            optimize=True,
-            options=["--lossy=80", "--scale", str(percent)],
+    budget = max_size * 1024
+    if len(gif_bytes) < budget:
+        return gif_bytes
+
+    _scale_gif = _gifsicle_scale if shutil.which(GIFSICLE) else _pillow_gif_scale
+    target = budget * (1 - tolerance / 2)
+    best = None  # 未超出大小的最大比例: (data, scale)
+    too_big = (1.0, len(gif_bytes))  # 超出大小的最小比例: (scale, size)
+    passes = 0
+    while True:
+        hi, hi_size = too_big
+        if best is None:
+            # 均以原图为基准缩放, 避免反复有损压缩
+            scale = hi * (target / hi_size) ** 0.5
+            if passes >= max_passes:
+                scale = min(scale, hi * 0.7)  # 保证收敛
+        else:
+            lo, lo_size = best[1], len(best[0])
+            ratio = (target - lo_size) / max(hi_size - lo_size, 1)
+            scale = (lo**2 + (hi**2 - lo**2) * ratio) ** 0.5
+            # 每次至少收窄区间的 10%
+            scale = min(max(scale, lo + (hi - lo) * 0.1), hi - (hi - lo) * 0.1)
+        data = _scale_gif(gif_bytes, scale)
+        size = len(data)
+        passes += 1
+        if size < budget:
+            if best is None or scale > best[1]:
+                best = (data, scale)
+        elif scale < hi:
+            too_big = (scale, size)
+        if best is not None and (
+            len(best[0]) >= budget * (1 - tolerance)
+            or passes >= max_passes
+            or too_big[0] - best[1] < 0.005
+        ):
+            break
+    data, scale = best
+    logger.debug("zip gif %s passes, scale %.3f, size %s", passes, scale, len(data))
+    return data
+
+
+JPEG_QUALITY_MIN = 40
+JPEG_QUALITY_MAX = 90
+JPEG_QUALITY = 75  # 缩小尺寸时使用的 jpeg 质量，同 Pillow 默认值
+MAX_ENCODES = 8
+IMAGE_MAX_MEMORY = 128 * 1024 * 1024  # 128 mb，单张图片解码后占用的内存上限
+# 压缩后每像素字节数的下限估计，解码前据此确定目标分辨率，超出的像素不必解码
+MIN_BYTES_PER_PIXEL = 0.05
+
+
+def _source_size(source: Union[bytes, str, BinaryIO]) -> int:
+    """the size of image bytes, file path or file object, without reading it"""
+    if isinstance(source, bytes):
+        return len(source)
+    if isinstance(source, str):
+        return os.path.getsize(source)
+    pos = source.tell()
+    size = source.seek(0, os.SEEK_END) - pos
+    source.seek(pos)
+    return size
+
+
+def _read_source(source: Union[bytes, str, BinaryIO]) -> bytes:
+    """read image bytes from file path or file object"""
+    if isinstance(source, bytes):
+        return source
+    if isinstance(source, str):
+        return _read_file_to_bytes(source)
+    return source.read()
+
+
+def _decode_image(
+    source: Union[bytes, str, BinaryIO], max_pixels: float, max_memory: Optional[int] = None
+) -> Tuple[Image.Image, str, float]:
+    """decode the image straight to about max_pixels, within max_memory bytes.
+
+    jpeg is decoded at 1/2, 1/4 or 1/8 scale by draft mode, so it fits both max_pixels and
+    max_memory; other formats can only be decoded at full size, and are reduced by an
+    integer factor after decoding, so ValueError is raised if that needs over max_memory.
+
+    returns the image, its format and its scale to the original size.
+    """
+    max_memory = IMAGE_MAX_MEMORY if max_memory is None else max_memory
+    img = Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+    fmt = img.format
+    x_size, y_size = img.size
+    # Pillow 以每像素 4 字节存储多通道图像
+    if x_size * y_size > max_pixels or x_size * y_size * 4 > max_memory:
+        ratio = min(1.0, (max_pixels / (x_size * y_size)) ** 0.5)
+        # draft 只能缩小到 1/2、1/4、1/8，且不小于请求的尺寸：按满足内存上限的最小倍数请求
+        scale = next((i for i in (1, 2, 4) if x_size * y_size * 4 / i**2 <= max_memory), 8)
+        img.draft(
+            "RGB",
+            (
+                min(math.ceil(x_size * ratio), x_size // scale),
+                min(math.ceil(y_size * ratio), y_size // scale),
+            ),
         )
-        if not is_cover:
-            gif = destination
-        size = os.path.getsize(gif) / 1024
-        percent -= 0.05
-
-    return _read_file_to_bytes(gif)
-
-
-def _zip_image_bytes(img_bytes: bytes, max_size=IMAGE_MAX_SIZE_KB, file_type=None):
-    """zip image bytes and return bytes; default changed to .jpeg"""
-    file_type = file_type or filetype.guess(img_bytes).extension
-
-    with io.BytesIO(img_bytes) as io_image:
-        size = len(io_image.getvalue()) // 1024
-        if size < max_size:
-            return img_bytes
-        while size >= max_size:
-            img = Image.open(io_image)
-            x_size, y_size = img.size
-            out = img.resize((int(x_size * 0.95), int(y_size * 0.95)), Image.ANTIALIAS)
-            io_image.close()
-            io_image = io.BytesIO()
-            try:
-                out.save(io_image, "jpeg")
-            except:
-                out.save(io_image, file_type)
-            size = len(io_image.getvalue()) // 1024
-        return io_image.getvalue()
-
-
-def zip_image(path_bytes_string, max_size: int = IMAGE_MAX_SIZE_KB):
-    """zip image"""
-    file_bytes, is_file = get_filebytes(path_bytes_string)
-    file_type = filetype.guess(file_bytes).extension
-    try:
-        if file_type == "gif" and is_file:
-            img_bytes = _zip_gif(path_bytes_string, max_size=max_size, is_cover=False)
+    pixels = img.size[0] * img.size[1]
+    memory = pixels * (1 if img.mode in ("1", "L", "P") else 4)
+    if img.mode not in _REDUCIBLE_MODES and pixels >= max_pixels * 4:
+        memory += pixels * 4  # reduce 之前需转换模式，同时占用两份内存
+    if memory > max_memory:
+        raise ValueError(
+            f"decoding the image of {x_size}x{y_size} needs {memory} bytes, "
+            f"over max_memory {max_memory}"
+        )
+    img.load()
+    factor = int((img.size[0] * img.size[1] / max_pixels) ** 0.5)
+    if factor >= 2:
+        img = _reducible(img).reduce(factor)
+    return img, fmt, img.size[0] / x_size
+
+
+_REDUCIBLE_MODES = ("L", "LA", "RGB", "RGBA", "CMYK", "I", "F")
+
+
+def _reducible(img: Image.Image) -> Image.Image:
+    """the image in a mode which Image.reduce supports, keeping its transparency"""
+    if img.mode in _REDUCIBLE_MODES:
+        return img
+    if img.mode == "1":
+        return img.convert("L")
+    if img.mode.startswith("I;16"):
+        return img.convert("I")
+    return img.convert("RGBA" if not _can_be_jpeg(img) else "RGB")
+
+
+def _can_be_jpeg(img: Image.Image) -> bool:
+    """the image has no alpha channel, so it can be saved as jpeg without loss of transparency"""
+    if img.mode in ("RGBA", "LA", "PA"):
+        return False
+    return not (img.mode == "P" and "transparency" in img.info)
+
+
+def compress_image(
+    source: Union[bytes, str, BinaryIO],
+    max_size: int = IMAGE_MAX_SIZE_KB,
+    file_type: Optional[str] = None,
+    max_encodes: int = MAX_ENCODES,
+    max_memory: Optional[int] = None,
+) -> Tuple[bytes, Dict]:
+    """compress image bytes, file path or file object to less than max_size kb, decode only once.
+
+    the image is decoded straight to the most pixels that could fit max_size (by draft mode
+    for jpeg) and within max_memory bytes, IMAGE_MAX_MEMORY if None; only jpeg can be decoded
+    at a smaller scale, so ValueError is raised for other formats too large to decode in it.
+    jpeg quality is bisected at the decoded scale first; if it doesn't fit at the lowest quality,
+    the scale is estimated from the encoded size (bytes grow with pixels, so by scale**2)
+    and refined between the largest scale which fits and the smallest which doesn't.
+    images with transparency are kept in their own format and only scaled.
+
+    returns the bytes and stats as {"encodes": 2, "scale": 0.61, "quality": 75, "size": 201234}
+    """
+    budget = max_size * 1024
+    source_size = _source_size(source)
+    stats = {"encodes": 0, "scale": 1.0, "quality": None, "size": source_size}
+    if source_size < budget:
+        return _read_source(source), stats
+
+    img, img_format, decoded_scale = _decode_image(source, budget / MIN_BYTES_PER_PIXEL, max_memory)
+    if _can_be_jpeg(img):
+        fmt = "jpeg"
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+    else:
+        fmt = img_format or file_type or "png"
+    x_size, y_size = img.size
+
+    def _encode(scale: float, quality: Optional[int]) -> bytes:
+        stats["encodes"] += 1
+        out = img
+        if scale < 1:
+            size = (max(1, int(x_size * scale)), max(1, int(y_size * scale)))
+            out = img.resize(size, Image.LANCZOS)
+        with io.BytesIO() as io_out:
+            if quality:
+                out.save(io_out, fmt, quality=quality)
+            else:
+                out.save(io_out, fmt)
+            return io_out.getvalue()
+
+    best = None  # (bytes, scale, quality) 已满足大小的最佳结果
+
+    # 1. 未缩小解码时，原尺寸下二分 jpeg 质量
+    quality = JPEG_QUALITY_MIN if fmt == "jpeg" else None
+    data = _encode(1.0, quality) if decoded_scale == 1 else None
+    if data is not None and len(data) < budget:
+        best = (data, 1.0, quality)
+        low, high = JPEG_QUALITY_MIN, JPEG_QUALITY_MAX + 1
+        while fmt == "jpeg" and high - low > 5 and stats["encodes"] < max_encodes:
+            mid = (low + high) // 2
+            data = _encode(1.0, mid)
+            if len(data) < budget:
+                best, low = (data, 1.0, mid), mid
+            else:
+                high = mid
+    else:
+        # 2. 按 scale**2 估算尺寸，并在可行与不可行的尺寸之间收缩
+        quality = JPEG_QUALITY if fmt == "jpeg" else None
+        fits, too_big = 0.0, 1.0
+        if data is None:
+            # 已按估算解码到较小尺寸，从该尺寸开始
+            scale = 1.0
         else:
-            img_bytes = _zip_image_bytes(file_bytes, max_size=max_size, file_type=file_type)
+            scale = (budget / len(data)) ** 0.5 * 0.9
+        while True:
+            data = _encode(scale, quality)
+            if len(data) < budget:
+                best, fits = (data, scale, quality), scale
+                if len(data) > budget * 0.85:
+                    break
+            else:
+                too_big = scale
+            if stats["encodes"] >= max_encodes and best:
+                break
+            estimate = scale * (budget / len(data)) ** 0.5 * 0.95
+            if fits and too_big - fits < 0.02:
+                break
+            scale = min(max(estimate, fits + (too_big - fits) * 0.1), too_big * 0.97)
+            if not fits and stats["encodes"] >= max_encodes:
+                scale = min(scale, too_big * 0.7)  # 保证收敛
+
+    data, scale, stats["quality"] = best
+    stats["scale"] = scale * decoded_scale
+    stats["size"] = len(data)
+    logger.debug("compress image %s encodes, stats: %s", stats["encodes"], stats)
+    return data, stats
+
+
+def _image_source(img: Union[Dict, str, bytes, BinaryIO]):
+    """the image as bytes, or the file path / file object to stream from, and its name"""
+    if isinstance(img, bytes):
+        return img, None
+    if isinstance(img, str):
+        if os.path.exists(img):
+            if not os.path.isfile(img):
+                raise ValueError(f"{img} is not a file.")
+            return img, os.path.basename(img).encode().decode("utf-8")
+        return base64.b64decode(img), None
+    if isinstance(img, dict):
+        if "content" not in img:
+            raise ValueError("img dict must have content key")
+        content = img["content"]
+        # 已打包的图片 content 为 bytes，可直接再次传入
+        if isinstance(content, str):
+            content = base64.b64decode(content)
+        return content, img.get("name")
+    if hasattr(img, "read"):
+        name = getattr(img, "name", None)
+        return img, os.path.basename(name) if isinstance(name, str) else None
+    raise TypeError(f"not support for type: {type(img)}")
+
+
+def _zip_source(
+    source, max_size: int, file_type: Optional[str], max_memory: Optional[int] = None
+) -> bytes:
+    """zip the image from bytes, file path or file object, through the image cache"""
+    cache = get_image_cache()
+    if cache is None or _source_size(source) < max_size * 1024:
+        return _zip_source_uncached(source, max_size, file_type, max_memory)
+    key = cache.key(source, max_size)
+    data = cache.get(key)
+    if data is None:
+        data = _zip_source_uncached(source, max_size, file_type, max_memory)
+        cache.put(key, data)
+    return data
+
+
+def _zip_source_uncached(
+    source, max_size: int, file_type: Optional[str], max_memory: Optional[int] = None
+) -> bytes:
+    if file_type == "gif":
+        return _zip_gif(_read_source(source), max_size=max_size)
+    return compress_image(source, max_size=max_size, file_type=file_type, max_memory=max_memory)[0]
+
+
+def zip_image(
+    path_bytes_string, max_size: int = IMAGE_MAX_SIZE_KB, max_memory: Optional[int] = None
+):
+    """zip image of file path, file object, bytes or base64 string;
+    max_memory: bytes to decode the image, IMAGE_MAX_MEMORY if None; the image is returned
+    as it is if it can't be compressed, such as an image other than jpeg too large to decode"""
+    source, _ = _image_source(path_bytes_string)
+    pos = None if isinstance(source, (bytes, str)) else source.tell()
+    file_type = filetype.guess(source).extension
+    try:
+        img_bytes = _zip_source(source, max_size, file_type, max_memory)
     except Exception as err:
         logger.warning("zip_image %s", err)
-        img_bytes = file_bytes
+        if pos is not None:
+            source.seek(pos)
+        img_bytes = _read_source(source)
     return img_bytes
 
 
-def _pack_img_content(img: Union[Dict, str, bytes], max_size: int = IMAGE_MAX_SIZE_KB):
-    """pack image content"""
-    name = None
+def _pack_img_content(
+    img: Union[Dict, str, bytes, BinaryIO],
+    max_size: int = IMAGE_MAX_SIZE_KB,
+    max_memory: Optional[int] = None,
+):
+    """pack image content.
+
+    only the compressed bytes go through the image cache, not the packed dict: the name is
+    a new uuid for images without one, so the same image packed twice gets different names.
+    """
     if not img:
         logger.warning("image is empty")
         return None
-    if isinstance(img, bytes):
-        content = img
-    elif isinstance(img, str):
-        if os.path.exists(img):
-            content = _read_file_to_bytes(img)
-            name = os.path.basename(img).encode().decode("utf-8")
-        else:
-            content = base64.b64decode(img)
-    elif isinstance(img, dict):
-        if "content" not in img:
-            raise ValueError("img dict must have content key")
-        content = base64.b64decode(img["content"])
-        name = img.get("name")
-    else:
+    try:
+        content, name = _image_source(img)
+    except TypeError:
         logger.warning("not support for type: %s", type(img))
         return None
 
@@ -152,10 +430,7 @@ def _pack_img_content(img: Union[Dict, str, bytes], max_size: int = IMAGE_MAX_SI
         name = ".".join([_uid, file_type])
     name = re.sub(r"([ :])", r"_", name)
 
-    if file_type == "gif":
-        content = _zip_gif(img, max_size=max_size, is_cover=False)
-    else:
-        content = _zip_image_bytes(content, max_size=max_size, file_type=file_type)
+    content = _zip_source(content, max_size, file_type, max_memory)
 
     return {
         "name": name,
@@ -164,13 +439,111 @@ def _pack_img_content(img: Union[Dict, str, bytes], max_size: int = IMAGE_MAX_SI
     }
 
 
-def pack_images(images: List):
-    """pack images"""
-    max_size = int(IMAGE_MAX_SIZE_KB // min(len(images), IMAGE_MAX_NUM))
-    return [_pack_img_content(img, max_size=max_size) for img in images]
+def _images_max_size(images: List) -> int:
+    """the size budget of each image of a trx"""
+    return int(IMAGE_MAX_SIZE_KB // min(len(images), IMAGE_MAX_NUM))
+
 
+def pack_images(
+    images: List, packer: Optional["ImagePacker"] = None, max_memory: Optional[int] = None
+):
+    """pack images, in parallel on the packer or a shared ImagePacker if more than one;
+    max_memory: bytes to decode each image, the packer's or IMAGE_MAX_MEMORY if None"""
+    if len(images) < 2:
+        max_size = _images_max_size(images)
+        return [_pack_img_content(img, max_size, max_memory) for img in images]
+    return (packer or _get_default_packer()).pack_images(images, max_memory)
 
-def pack_profile_image(image):
+
+def pack_profile_image(image, max_memory: Optional[int] = None):
     """pack the image for profile"""
-    file_bytes = zip_image(image, 200)
+    file_bytes = zip_image(image, 200, max_memory)
     return {"content": file_bytes, "mediaType": filetype.guess(file_bytes).mime}
+
+
+class ImagePacker:
+    """pack images on a pool of workers, with a bounded queue of pending images.
+
+    it can be used on its own to pack images ahead of a send, and the packed images
+    can be passed as images of send_content, reply_trx or edit_trx as they are.
+
+    PIL releases the GIL while resizing and encoding, so a thread pool is used by default;
+    a ProcessPoolExecutor can be given as executor for images of bytes, base64 or file path.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        executor: Optional[Executor] = None,
+        max_pending: Optional[int] = None,
+        max_memory: Optional[int] = None,
+    ):
+        """
+        Args:
+            max_workers (int, optional): threads of the pool, defaults to IMAGE_MAX_NUM or cpu count.
+            executor (Executor, optional): the pool to use instead, which is not shut down by close.
+            max_pending (int, optional): images queued or being packed at most, submit blocks
+                when it is reached; defaults to twice of max_workers.
+            max_memory (int, optional): bytes to decode each image, IMAGE_MAX_MEMORY if None.
+        """
+        self.max_memory = max_memory
+        self.max_workers = max_workers or min(IMAGE_MAX_NUM, os.cpu_count() or 1)
+        self._own_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(
+            self.max_workers, thread_name_prefix="mininode-image"
+        )
+        self._pending = threading.BoundedSemaphore(max_pending or self.max_workers * 2)
+
+    def submit(self, func, *args) -> Future:
+        """submit a packing function, block while the queue is full"""
+        self._pending.acquire()
+        try:
+            future = self.executor.submit(func, *args)
+        except BaseException:
+            self._pending.release()
+            raise
+        future.add_done_callback(lambda _: self._pending.release())
+        return future
+
+    def pack_image(
+        self,
+        img: Union[Dict, str, bytes],
+        max_size: int = IMAGE_MAX_SIZE_KB,
+        max_memory: Optional[int] = None,
+    ) -> Future:
+        """pack one image in the background, the future's result is {name, content, mediaType}"""
+        return self.submit(_pack_img_content, img, max_size, max_memory or self.max_memory)
+
+    def pack_images(self, images: List, max_memory: Optional[int] = None) -> List:
+        """pack the images of one trx in parallel, in the order of images"""
+        max_size = _images_max_size(images)
+        futures = [self.pack_image(img, max_size, max_memory) for img in images]
+        return [future.result() for future in futures]
+
+    def pack_profile_image(self, image, max_memory: Optional[int] = None) -> Future:
+        """pack the image for profile in the background"""
+        return self.submit(pack_profile_image, image, max_memory or self.max_memory)
+
+    def close(self):
+        """shut down the pool created by the packer"""
+        if self._own_executor:
+            self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_default_packer = None
+_default_packer_lock = threading.Lock()
+
+
+def _get_default_packer() -> ImagePacker:
+    """the ImagePacker shared by pack_images, created on first use"""
+    global _default_packer  # pylint: disable=global-statement
+    with _default_packer_lock:
+        if _default_packer is None:
+            _default_packer = ImagePacker()
+        return _default_packer
@@ -0,0 +1,202 @@
+"""image_cache.py: content-addressed cache of compressed images"""
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import BinaryIO, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+_READ_CHUNK = 1024 * 1024
+
+
+def source_digest(source: Union[bytes, str, BinaryIO]) -> str:
+    """sha256 of image bytes, file path or file object, read in chunks"""
+    if isinstance(source, bytes):
+        return hashlib.sha256(source).hexdigest()
+    digest = hashlib.sha256()
+    if isinstance(source, str):
+        with open(source, "rb") as read_f:
+            for chunk in iter(lambda: read_f.read(_READ_CHUNK), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+    pos = source.tell()
+    for chunk in iter(lambda: source.read(_READ_CHUNK), b""):
+        digest.update(chunk)
+    source.seek(pos)
+    return digest.hexdigest()
+
+
+class ImageCache:
+    """the compressed bytes of images, keyed by the sha256 of the source and the size budget.
+
+    an in-memory LRU tier, and an optional on-disk tier under path which evicts the
+    least recently used files when it grows over max_disk_bytes.
+
+    it deliberately keeps the compressed bytes rather than the packed image dict, whose name
+    and mediaType depend on how the image is given; compressing is the costly part, and
+    the bytes are the same for every packing of the same source and size.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 32 * 1024 * 1024,
+        path: Optional[str] = None,
+        max_disk_bytes: int = 256 * 1024 * 1024,
+    ):
+        """
+        Args:
+            max_bytes (int, optional): bytes of images kept in memory, 0 to disable the tier.
+            path (str, optional): the directory of the on-disk tier, disabled if None.
+            max_disk_bytes (int, optional): bytes of images kept on disk.
+        """
+        self.max_bytes = max_bytes
+        self.path = path
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._disk_bytes = sum(size for _, _, size in self._disk_files())
+
+    @staticmethod
+    def key(source: Union[bytes, str, BinaryIO], max_size: int) -> str:
+        """the cache key of the source compressed to max_size kb"""
+        return f"{source_digest(source)}-{max_size}"
+
+    def get(self, key: str) -> Optional[bytes]:
+        """the cached bytes, or None"""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self._stats["hits"] += 1
+                return data
+        data = self._disk_get(key)
+        with self._lock:
+            if data is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+            self._memory_put(key, data)
+        return data
+
+    def put(self, key: str, data: bytes):
+        """cache the bytes in memory, and on disk if enabled"""
+        with self._lock:
+            self._memory_put(key, data)
+        self._disk_put(key, data)
+
+    def stats(self) -> Dict:
+        """hits, disk_hits, misses, evictions, and the bytes of each tier"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update(
+                items=len(self._memory),
+                memory_bytes=self._memory_bytes,
+                disk_bytes=self._disk_bytes,
+            )
+        lookups = stats["hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        """remove all the images of both tiers"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            for file, _, _ in self._disk_files():
+                os.remove(file)
+            self._disk_bytes = 0
+
+    def _memory_put(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_bytes:
+            _, old = self._memory.popitem(last=False)
+            self._memory_bytes -= len(old)
+            self._stats["evictions"] += 1
+
+    def _disk_files(self):
+        """(file, mtime, size) of the on-disk tier"""
+        files = []
+        if not self.path:
+            return files
+        for entry in os.scandir(self.path):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                files.append((entry.path, stat.st_mtime, stat.st_size))
+        return files
+
+    def _disk_get(self, key: str) -> Optional[bytes]:
+        if not self.path:
+            return None
+        file = os.path.join(self.path, key)
+        try:
+            with open(file, "rb") as read_f:
+                data = read_f.read()
+            os.utime(file)  # mtime 作为最近使用时间
+            return data
+        except FileNotFoundError:
+            return None
+        except OSError as err:
+            logger.warning("image cache read %s error: %s", file, err)
+            return None
+
+    def _disk_put(self, key: str, data: bytes):
+        if not self.path or len(data) > self.max_disk_bytes:
+            return
+        file = os.path.join(self.path, key)
+        try:
+            # 先写临时文件再替换，避免并发读到不完整的文件
+            fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+            with os.fdopen(fd, "wb") as write_f:
+                write_f.write(data)
+            existed = os.path.exists(file)
+            os.replace(tmp, file)
+        except OSError as err:
+            logger.warning("image cache write %s error: %s", file, err)
+            return
+        with self._lock:
+            if not existed:
+                self._disk_bytes += len(data)
+            if self._disk_bytes > self.max_disk_bytes:
+                self._disk_evict()
+
+    def _disk_evict(self):
+        """remove the least recently used files until under max_disk_bytes"""
+        files = sorted(self._disk_files(), key=lambda i: i[1])
+        self._disk_bytes = sum(size for _, _, size in files)
+        for file, _, size in files:
+            if self._disk_bytes <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(file)
+            except FileNotFoundError:
+                pass
+            self._disk_bytes -= size
+            self._stats["evictions"] += 1
+
+
+_image_cache: Optional[ImageCache] = ImageCache()
+
+
+def get_image_cache() -> Optional[ImageCache]:
+    """the cache used to pack images, None if disabled"""
+    return _image_cache
+
+
+def set_image_cache(cache: Optional[ImageCache]):
+    """replace the cache used to pack images, such as ImageCache(path="./image_cache"),
+    or None to disable it"""
+    global _image_cache  # pylint: disable=global-statement
+    _image_cache = cache
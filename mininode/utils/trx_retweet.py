@@ -1,5 +1,4 @@
 """trx retweet"""
-
 import datetime
 import logging
 from typing import Dict, List, Optional, Tuple, Union
@@ -19,6 +18,7 @@ CLIENT_TRX_TYPES = [
     "text_only",
     "like",
     "dislike",
+    "file",
     "other",
 ]
 
@@ -110,6 +110,41 @@ def get_trx_type(trx: Dict, deep_to_reply=False) -> str:
     return result
 
 
+def get_pb_trx_type(typeurl: str, obj, deep_to_reply=False) -> str:
+    """get type of trx by its typeurl and decrypted pbQuorum.Object / pbQuorum.Person,
+    the same as get_trx_type but without converting the protobuf to dict"""
+    if typeurl == "quorum.pb.Person":
+        return "person"
+    if typeurl != "quorum.pb.Object" or obj is None:
+        return "encrypted"
+
+    trxtype = obj.type or "other"
+    if trxtype != "Note":
+        return trxtype.lower()  # "like","dislike","file"
+
+    has_image = len(obj.image) > 0
+    if obj.HasField("inreplyto"):
+        if not deep_to_reply:
+            return "reply"
+        if has_image:
+            if not obj.content:
+                result = "reply_image_only"
+            else:
+                result = "reply_image_text"
+        else:
+            result = "reply_text_only"
+        return result
+
+    if has_image:
+        if not obj.content:
+            result = "image_only"
+        else:
+            result = "image_text"
+    else:
+        result = "text_only"
+    return result
+
+
 def init_trx_retweet_params(
     trx: Dict,
     refer_trx: Optional[Dict] = None,
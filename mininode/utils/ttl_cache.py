@@ -0,0 +1,213 @@
+"""ttl_cache.py: an LRU cache with ttl, which coalesces the concurrent loads of a key"""
+import asyncio
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+_MISSING = object()
+
+
+class TTLCache:
+    """up to max_items values and max_bytes, each kept for ttl seconds, the least recently
+    used evicted first.
+
+    get_or_load and aget_or_load are single-flight: while a key is loading, the other
+    threads or tasks which miss it wait for the same load instead of loading it again.
+    the cached values are shared by the callers, and should not be modified.
+    """
+
+    def __init__(
+        self,
+        max_items: int = 1024,
+        ttl: Optional[float] = 300.0,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[Any], int]] = None,
+    ):
+        """
+        Args:
+            max_items (int, optional): values kept at most.
+            ttl (float, optional): seconds a value is kept, forever if None.
+            max_bytes (int, optional): the total size of the values kept at most, by sizeof;
+                a value larger than it is not cached; no limit if None.
+            sizeof (callable, optional): the size of a value, sys.getsizeof if None.
+        """
+        self.max_items = max_items
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or sys.getsizeof
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._ainflight: Dict[Hashable, asyncio.Future] = {}
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "errors": 0,
+        }
+
+    def _get(self, key: Hashable) -> Any:
+        """the value or _MISSING, called with the lock held"""
+        item = self._items.get(key)
+        if item is None:
+            return _MISSING
+        expires, value, size = item
+        if expires is not None and expires <= time.monotonic():
+            del self._items[key]
+            self._bytes -= size
+            self._stats["expirations"] += 1
+            return _MISSING
+        self._items.move_to_end(key)
+        return value
+
+    def _size(self, value: Any) -> int:
+        """the size of value, called without the lock as sizeof may be slow"""
+        return self.sizeof(value) if self.max_bytes is not None else 0
+
+    def _put(self, key: Hashable, value: Any, size: int):
+        """called with the lock held"""
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        self._pop(key)
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        self._items[key] = (expires, value, size)
+        self._bytes += size
+        while len(self._items) > self.max_items or (
+            self.max_bytes is not None and self._bytes > self.max_bytes
+        ):
+            _, (_, _, old_size) = self._items.popitem(last=False)
+            self._bytes -= old_size
+            self._stats["evictions"] += 1
+
+    def _pop(self, key: Hashable):
+        """called with the lock held"""
+        item = self._items.pop(key, None)
+        if item is not None:
+            self._bytes -= item[2]
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """the cached value, or default"""
+        with self._lock:
+            value = self._get(key)
+            if value is _MISSING:
+                self._stats["misses"] += 1
+                return default
+            self._stats["hits"] += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        """cache the value"""
+        size = self._size(value)
+        with self._lock:
+            self._put(key, value, size)
+
+    def delete(self, key: Hashable):
+        """remove the value of key"""
+        with self._lock:
+            self._pop(key)
+
+    def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Any],
+        cacheable: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """the cached value, or the value returned by loader(), which is called once for
+        the concurrent misses of key; it is cached if cacheable(value) is not False"""
+        with self._lock:
+            value = self._get(key)
+            if value is not _MISSING:
+                self._stats["hits"] += 1
+                return value
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+                self._stats["misses"] += 1
+            else:
+                self._stats["coalesced"] += 1
+        if not leader:
+            return future.result()
+        try:
+            value = loader()
+            store = cacheable is None or cacheable(value)
+            size = self._size(value) if store else 0
+        except BaseException as err:
+            with self._lock:
+                self._stats["errors"] += 1
+                del self._inflight[key]
+            future.set_exception(err)
+            raise
+        with self._lock:
+            if store:
+                self._put(key, value, size)
+            del self._inflight[key]
+        future.set_result(value)
+        return value
+
+    async def aget_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable],
+        cacheable: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """asyncio version of get_or_load, loader() returns an awaitable"""
+        with self._lock:
+            value = self._get(key)
+            if value is not _MISSING:
+                self._stats["hits"] += 1
+                return value
+            future = self._ainflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._ainflight[key] = asyncio.get_running_loop().create_future()
+                self._stats["misses"] += 1
+            else:
+                self._stats["coalesced"] += 1
+        if not leader:
+            # shield: 等待方被取消时不影响正在进行的加载
+            return await asyncio.shield(future)
+        try:
+            value = await loader()
+            store = cacheable is None or cacheable(value)
+            size = self._size(value) if store else 0
+        except BaseException as err:
+            with self._lock:
+                self._stats["errors"] += 1
+                del self._ainflight[key]
+            if isinstance(err, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(err)
+                future.exception()  # 没有等待方时不报 "exception was never retrieved"
+            raise
+        with self._lock:
+            if store:
+                self._put(key, value, size)
+            del self._ainflight[key]
+        future.set_result(value)
+        return value
+
+    def stats(self) -> Dict:
+        """hits, misses, coalesced, evictions, expirations, errors, items, bytes and hit_rate;
+        coalesced are the misses which waited for the load of another caller"""
+        with self._lock:
+            stats = dict(self._stats, items=len(self._items), bytes=self._bytes)
+        lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        """remove all the values"""
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._items)
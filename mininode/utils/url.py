@@ -80,11 +80,15 @@ def decode_seed_url(seedurl: str) -> Dict:
         raise ValueError("invalid seedurl, must start with rum://seed?, shared by rum fullnode.")
 
     # 由于 Python 的实现中，每个 key 的 value 都是 列表，所以做了下述处理
-    # TODO: 如果 u 参数的值有多个，该方法需升级
+    # u 参数可以有多个值，对应多个 fullnode；其它参数只能有一个值
     query_dict = {}
+    urls = []
     _q = parse.urlparse(seedurl).query
     for key, value in parse.parse_qs(_q).items():
-        if len(value) == 1:
+        if key == "u":
+            urls = value
+            query_dict[key] = value[0]
+        elif len(value) == 1:
             query_dict[key] = value[0]
         else:
             raise ValueError(f"key:{key}, value:{value}, is not 1:1, please check.")
@@ -96,6 +100,7 @@ def decode_seed_url(seedurl: str) -> Dict:
         "owner": _decode_pubkey(query_dict.get("k")),
         "chiperkey": _decode_cipher_key(query_dict.get("c")),
         "url": query_dict.get("u"),
+        "urls": urls,
         "timestamp": _decode_timestamp(query_dict.get("t")),
     }
     try:
@@ -30,9 +30,12 @@ setuptools.setup(
         "requests",
         "filetype",
         "pillow",
-        "pygifsicle",
         "eth_keys",
         "protobuf",
         "eth_account",
     ],
+    extras_require={
+        "async": ["aiohttp"],
+        "fast": ["cryptography", "coincurve"],
+    },
 )
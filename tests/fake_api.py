@@ -0,0 +1,61 @@
+"""fake_api.py: an in-memory api of a group, to test the pagers, followers and dispatcher"""
+
+from typing import Dict, List, Optional
+
+
+def make_trxs(num: int, senders=("alice", "bob")) -> List[Dict]:
+    """encrypted-like trxs whose Data is the content"""
+    return [
+        {
+            "TrxId": f"trx-{i}",
+            "SenderPubkey": senders[i % len(senders)],
+            "TimeStamp": str(1_000_000_000 + i),
+            "Data": str(i),
+        }
+        for i in range(num)
+    ]
+
+
+class FakeAPI:
+    """serves the trxs after start_trx; pages listed in responses are returned first"""
+
+    def __init__(self, trxs: List[Dict], responses: Optional[List] = None):
+        self.group_id = "group"
+        self.trxs = trxs
+        self.responses = list(responses or [])
+        self.calls = 0
+
+    def _get_encrypted_content(
+        self, start_trx: Optional[str] = None, num: int = 20, reverse: bool = False
+    ):
+        self.calls += 1
+        if self.responses:
+            resp = self.responses.pop(0)
+            if resp is not None:
+                return resp
+        trxs = self.trxs[::-1] if reverse else self.trxs
+        ids = [i["TrxId"] for i in trxs]
+        start = ids.index(start_trx) + 1 if start_trx in ids else 0
+        return trxs[start : start + num]
+
+    @staticmethod
+    def _decrypt_contents(encrypted_trxs, senders=None, trx_types=None, lazy=False):
+        return [
+            {
+                "TrxId": i["TrxId"],
+                "Publisher": i["SenderPubkey"],
+                "TypeUrl": "quorum.pb.Object",
+                "Content": {"type": "Note", "content": i["Data"]},
+            }
+            for i in encrypted_trxs
+            if not senders or i["SenderPubkey"] in senders
+        ]
+
+
+class AsyncFakeAPI(FakeAPI):
+    """asyncio version of FakeAPI"""
+
+    async def _get_encrypted_content(
+        self, start_trx: Optional[str] = None, num: int = 20, reverse: bool = False
+    ):
+        return super()._get_encrypted_content(start_trx, num, reverse)
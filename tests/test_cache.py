@@ -0,0 +1,86 @@
+"""test the cache of get_trx and trx"""
+
+import asyncio
+import base64
+import os
+
+from mininode.api import AsyncQuorumLightNodeAPI, QuorumLightNodeAPI
+from mininode.crypto.sign_trx import aes_encrypt, pack_obj
+from mininode.utils import TTLCache
+
+
+class _Http:
+    """answers every get with the trx, and counts the requests"""
+
+    def __init__(self, trx):
+        self.trx = trx
+        self.gets = 0
+
+    def get(self, endpoint, payload=None):
+        self.gets += 1
+        return dict(self.trx)
+
+
+class _AsyncHttp(_Http):
+    """asyncio version of _Http"""
+
+    async def get(self, endpoint, payload=None):
+        return super().get(endpoint, payload)
+
+
+def _api(api_class=QuorumLightNodeAPI, http_class=_Http):
+    aes_key = os.urandom(32)
+    data = aes_encrypt(aes_key, pack_obj({"type": "Note", "content": "hello"}))
+    trx = {
+        "TrxId": "trx-0",
+        "SenderPubkey": "alice",
+        "TimeStamp": "1000000000",
+        "Data": base64.b64encode(data).decode(),
+    }
+    http = http_class(trx)
+    return api_class(http, "group", aes_key), http
+
+
+def test_trx_is_cached_but_not_shared():
+    api, http = _api()
+    trx = api.trx("trx-0")
+    trx["Content"]["content"] = "modified"
+    assert api.trx("trx-0")["Content"]["content"] == "hello"
+    assert http.gets == 1
+
+
+def test_get_trx_is_cached_but_not_shared():
+    api, http = _api()
+    trx = api.get_trx("trx-0")
+    trx["Data"] = "modified"
+    assert api.get_trx("trx-0")["Data"] != "modified"
+    assert api.trx("trx-0")["Content"]["content"] == "hello"
+    assert http.gets == 1
+
+
+def test_async_get_trx_is_not_shared():
+    async def _get_twice(api):
+        trx = await api.get_trx("trx-0")
+        trx["Data"] = "modified"
+        return await api.get_trx("trx-0")
+
+    api, http = _api(AsyncQuorumLightNodeAPI, _AsyncHttp)
+    assert asyncio.run(_get_twice(api))["Data"] != "modified"
+    assert http.gets == 1
+
+
+def test_cache_is_bounded_by_bytes():
+    cache = TTLCache(max_items=100, max_bytes=10, sizeof=len)
+    cache.put("a", "12345")
+    cache.put("b", "12345")
+    cache.put("c", "123")  # 超出 max_bytes，淘汰最久未用的 a
+    assert cache.get("a") is None and cache.get("b") == "12345"
+    cache.put("big", "x" * 11)  # 单个超过 max_bytes 的值不缓存
+    assert cache.get("big") is None
+    assert cache.stats()["bytes"] == 8
+
+
+def test_default_cache_sizes_trxs_by_data():
+    api, _ = _api()
+    api.get_trx("trx-0")
+    assert 0 < api.cache.stats()["bytes"] < 1024
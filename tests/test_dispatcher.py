@@ -0,0 +1,38 @@
+"""test the dispatcher"""
+
+from mininode.api import Dispatcher
+from tests.fake_api import FakeAPI, make_trxs
+
+
+def _trxs(num: int):
+    return FakeAPI._decrypt_contents(make_trxs(num))
+
+
+def test_dispatcher_keeps_order_of_sender():
+    handled = []
+    with Dispatcher(workers=4, capacity=4, batch=2) as dispatcher:
+        dispatcher.add_handler(lambda trx: handled.append(trx["TrxId"]))
+        dispatcher.run(_trxs(20))
+    alice = [i for i in handled if int(i.split("-")[1]) % 2 == 0]
+    assert alice == [f"trx-{i}" for i in range(0, 20, 2)]
+    assert dispatcher.stats()["handled"] == 20
+
+
+def test_dispatcher_survives_on_error_raising():
+    def on_error(handler, trx, err):
+        raise RuntimeError("on_error failed")
+
+    def fail(trx):
+        raise ValueError(trx["TrxId"])
+
+    dispatcher = Dispatcher(workers=2, capacity=2, on_error=on_error)
+    dispatcher.add_handler(fail)
+    try:
+        # capacity 小于 trx 数：若出错的 trx 不释放容量，dispatch 会一直阻塞
+        for trx in _trxs(6):
+            assert dispatcher.dispatch(trx, timeout=2)
+        assert dispatcher.join(timeout=2)
+    finally:
+        dispatcher.close(wait=False)
+    stats = dispatcher.stats()
+    assert stats["errors"] == 6 and stats["pending"] == 0
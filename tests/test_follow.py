@@ -0,0 +1,63 @@
+"""test follow with checkpoints"""
+
+import asyncio
+
+from mininode.api import AsyncFollower, Checkpoint, CheckpointStore, Follower
+from tests.fake_api import AsyncFakeAPI, FakeAPI, make_trxs
+
+FOLLOW = dict(num=4, min_interval=0.01, max_interval=0.02, max_idle=0.05)
+
+
+def _store(api) -> CheckpointStore:
+    """a store whose cursor is the first trx, as if an earlier run handled it"""
+    store = CheckpointStore()
+    store.set(api.group_id, "default", api.trxs[0]["TrxId"])
+    return store
+
+
+def test_follower_resumes_from_checkpoint():
+    api = FakeAPI(make_trxs(10))
+    store = _store(api)
+    got = []
+    for trx in Follower(api, checkpoint=Checkpoint(store, api.group_id, every=1), **FOLLOW):
+        if len(got) == 3:
+            break  # 第 4 条尚未处理完
+        got.append(trx["TrxId"])
+    assert got == ["trx-1", "trx-2", "trx-3"]
+    assert store.get(api.group_id) == "trx-3"
+
+    follower = Follower(api, checkpoint=Checkpoint(store, api.group_id), **FOLLOW)
+    rest = [trx["TrxId"] for trx in follower]
+    assert rest == [f"trx-{i}" for i in range(4, 10)]
+    assert store.get(api.group_id) == "trx-9"
+
+
+def test_follower_commits_filtered_trxs():
+    api = FakeAPI(make_trxs(6))
+    store = _store(api)
+    follower = Follower(
+        api, senders=["alice"], checkpoint=Checkpoint(store, api.group_id), **FOLLOW
+    )
+    assert [trx["TrxId"] for trx in follower] == ["trx-2", "trx-4"]
+    assert store.get(api.group_id) == "trx-5"
+
+
+def test_async_follower_resumes_from_checkpoint():
+    async def _follow(api, store, limit=None):
+        got = []
+        follower = AsyncFollower(api, checkpoint=Checkpoint(store, api.group_id), **FOLLOW)
+        agen = follower.__aiter__()
+        try:
+            async for trx in agen:
+                if len(got) == limit:
+                    break
+                got.append(trx["TrxId"])
+        finally:
+            await agen.aclose()
+        return got
+
+    api = AsyncFakeAPI(make_trxs(10))
+    store = _store(api)
+    assert asyncio.run(_follow(api, store, limit=4)) == [f"trx-{i}" for i in range(1, 5)]
+    assert store.get(api.group_id) == "trx-4"
+    assert asyncio.run(_follow(api, store)) == [f"trx-{i}" for i in range(5, 10)]
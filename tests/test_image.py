@@ -0,0 +1,44 @@
+"""test the compression of images"""
+
+import io
+
+import pytest
+from PIL import Image
+
+from mininode.utils import image
+
+
+def _gif(frames: int = 8, size=(320, 240)) -> bytes:
+    imgs = [Image.effect_noise(size, 30 + i).convert("P") for i in range(frames)]
+    with io.BytesIO() as out:
+        imgs[0].save(out, "gif", save_all=True, append_images=imgs[1:], duration=80, loop=0)
+        return out.getvalue()
+
+
+def test_zip_gif_fills_the_budget(monkeypatch):
+    monkeypatch.setattr(image, "GIFSICLE", "gifsicle-not-installed")  # 使用 Pillow 缩放
+    gif = _gif()
+    for max_size in (50, 100):
+        data = image._zip_gif(gif, max_size)
+        assert max_size * 1024 * 0.85 <= len(data) < max_size * 1024
+
+
+def _encode(img: Image.Image, fmt: str) -> bytes:
+    with io.BytesIO() as out:
+        img.save(out, fmt)
+        return out.getvalue()
+
+
+def test_compress_image_keeps_to_max_memory():
+    noise = Image.effect_noise((2000, 2000), 40)
+    rgb = Image.merge("RGB", [noise] * 3)
+    max_memory = 4 * 1024 * 1024  # 解码全尺寸 RGB 需要 16 mb
+    # jpeg 以 draft 模式缩小解码，仍可压缩
+    data, stats = image.compress_image(_encode(rgb, "jpeg"), 50, max_memory=max_memory)
+    assert len(data) < 50 * 1024 and stats["scale"] < 1
+    # png 只能全尺寸解码，超出 max_memory 时不解码
+    with pytest.raises(ValueError):
+        image.compress_image(_encode(rgb, "png"), 50, max_memory=max_memory)
+    # 调色板图片 reduce 前需转换模式，同样计入内存
+    data, _ = image.compress_image(_encode(noise.convert("P"), "png"), 50)
+    assert len(data) < 50 * 1024
@@ -0,0 +1,62 @@
+"""test the outbox with concurrent flushes"""
+
+import base64
+import json
+import os
+import threading
+import time
+
+from mininode.api import Outbox
+from mininode.crypto.sign_trx import aes_decrypt
+from mininode.proto import pbQuorum
+
+
+class _PostAPI:
+    """records the posted TrxIds, slowly, so concurrent flushes overlap"""
+
+    def __init__(self):
+        self.group_id = "group"
+        self.aes_key = os.urandom(32)
+        self.version = 1
+        self.posted = []
+        self._lock = threading.Lock()
+
+    def _post(self, endpoint, payload=None):
+        time.sleep(0.01)
+        item = json.loads(aes_decrypt(self.aes_key, base64.b64decode(payload["TrxItem"])))
+        trx = pbQuorum.Trx()
+        trx.ParseFromString(base64.b64decode(item["TrxBytes"]))
+        with self._lock:
+            self.posted.append(trx.TrxId)
+        return {"trx_id": trx.TrxId}
+
+
+def test_concurrent_flushes_send_each_trx_once(tmp_path):
+    api = _PostAPI()
+    path = str(tmp_path / "outbox.db")
+    private_key = os.urandom(32)
+    # 两个 Outbox 共用一个文件，各有两个线程同时 flush
+    outboxes = [Outbox(api, path), Outbox(api, path)]
+    trx_ids = [outboxes[0].put(private_key, {"type": "Note", "content": str(i)}) for i in range(20)]
+    outboxes[1].register(private_key)
+    threads = [threading.Thread(target=box.flush) for box in outboxes for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(api.posted) == sorted(trx_ids)
+    assert outboxes[0].stats()["sent"] == 20
+    for box in outboxes:
+        box.close()
+
+
+def test_unregistered_trxs_stay_pending(tmp_path):
+    api = _PostAPI()
+    private_key = os.urandom(32)
+    with Outbox(api, str(tmp_path / "outbox.db")) as box:
+        box.put(private_key, {"type": "Note", "content": "hello"})
+    with Outbox(api, str(tmp_path / "outbox.db")) as box:
+        assert box.flush()["skipped"] == 1
+        assert box.stats()["pending"] == 1
+        box.register(private_key)
+        assert box.flush()["sent"] == 1
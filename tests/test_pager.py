@@ -0,0 +1,58 @@
+"""test the pagers with empty pages and error responses"""
+
+import asyncio
+
+from mininode.api import AsyncContentPager, ContentPager
+from tests.fake_api import AsyncFakeAPI, FakeAPI, make_trxs
+
+PAGE = dict(min_num=3, max_num=3, retry_interval=0.01)
+ALL = [f"trx-{i}" for i in range(10)]
+
+
+def test_pager_goes_on_after_a_transient_empty_page():
+    # 第 2 页暂时为空，重试同一游标后继续
+    api = FakeAPI(make_trxs(10), responses=[None, [], None])
+    pager = ContentPager(api, **PAGE)
+    assert [trx["TrxId"] for trx in pager] == ALL
+    assert pager.stats.trxs == 10 and pager.stats.errors == 0
+
+
+def test_pager_does_not_count_errors_as_stalls():
+    api = FakeAPI(make_trxs(10), responses=[None, [], {"error": "busy"}, None])
+    pager = ContentPager(api, stall_limit=2, **PAGE)
+    assert [trx["TrxId"] for trx in pager] == ALL
+    assert pager.stats.errors == 1
+
+
+def test_pager_stops_after_error_limit():
+    api = FakeAPI(make_trxs(10), responses=[None] + [{"error": "down"}] * 3)
+    pager = ContentPager(api, error_limit=3, **PAGE)
+    assert [trx["TrxId"] for trx in pager] == ALL[:3]
+    assert pager.stats.errors == 3
+
+
+def test_async_pager_goes_on_after_errors_and_empty_pages():
+    async def _crawl(pager):
+        return [trx["TrxId"] async for trx in pager]
+
+    api = AsyncFakeAPI(make_trxs(10), responses=[None, {"error": "busy"}, [], None])
+    pager = AsyncContentPager(api, stall_limit=2, **PAGE)
+    assert asyncio.run(_crawl(pager)) == ALL
+    assert pager.stats.errors == 1
+
+
+class _GapAPI(FakeAPI):
+    """returns an empty window after trx-5 unless at least 12 trxs are requested"""
+
+    def _get_encrypted_content(self, start_trx=None, num=20, reverse=False):
+        if start_trx == "trx-5" and num < 12:
+            self.calls += 1
+            return []
+        return super()._get_encrypted_content(start_trx, num, reverse)
+
+
+def test_pager_grows_the_page_past_an_empty_window():
+    api = _GapAPI(make_trxs(20))
+    # target_latency=0 使页大小保持 min_num，直到遇到空窗口
+    pager = ContentPager(api, min_num=3, max_num=24, target_latency=0, retry_interval=0.01)
+    assert [trx["TrxId"] for trx in pager] == [f"trx-{i}" for i in range(20)]
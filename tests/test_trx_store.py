@@ -0,0 +1,56 @@
+"""test the local store of trxs"""
+
+import asyncio
+import base64
+import os
+from unittest import mock
+
+from mininode.api import AsyncQuorumLightNodeAPI, TrxStore
+from mininode.api import trx_store as trx_store_module
+from mininode.crypto.sign_trx import aes_encrypt, pack_obj
+
+
+def _trx(aes_key: bytes, i: int, obj) -> dict:
+    return {
+        "TrxId": f"trx-{i}",
+        "SenderPubkey": "alice",
+        "TimeStamp": str(1_000_000_000 + i),
+        "Data": base64.b64encode(aes_encrypt(aes_key, pack_obj(obj))).decode(),
+    }
+
+
+def test_types_are_indexed_once_when_queried():
+    aes_key = os.urandom(32)
+    note = {"type": "Note", "content": "hello"}
+    like = {"type": "Like", "id": "trx-0"}
+    trxs = [_trx(aes_key, 0, note), _trx(aes_key, 1, like), _trx(aes_key, 2, note)]
+    with (
+        TrxStore(":memory:") as store,
+        mock.patch.object(
+            trx_store_module, "trx_type_of", wraps=trx_store_module.trx_type_of
+        ) as type_of,
+    ):
+        assert store.put_many("group", trxs) == 3
+        assert type_of.call_count == 0  # 写入时不解密
+        assert store.count("group") == 3
+
+        liked = store.query("group", trx_types=["like"], aes_key=aes_key)
+        assert [i["TrxId"] for i in liked] == ["trx-1"]
+        assert type_of.call_count == 3
+
+        store.put_many("group", trxs)  # 再次保存保留已索引的 type
+        assert store.count("group", trx_types=["like"], aes_key=aes_key) == 1
+        assert type_of.call_count == 3
+
+
+def test_async_api_reads_the_store():
+    async def _read(api):
+        return await api.get_trx("trx-0"), await api.get_local_contents()
+
+    aes_key = os.urandom(32)
+    store = TrxStore(":memory:")
+    store.put("group", _trx(aes_key, 0, {"type": "Note", "content": "hello"}))
+    api = AsyncQuorumLightNodeAPI(None, "group", aes_key, store=store)
+    trx, local = asyncio.run(_read(api))
+    assert trx["TrxId"] == "trx-0"
+    assert [i["Content"]["content"] for i in local] == ["hello"]